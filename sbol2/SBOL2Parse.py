@@ -0,0 +1,296 @@
+"""A streaming reader for the RDF/XML written by SBOL2Serialize.
+
+The reader walks the XML with lxml.etree.iterparse and produces the
+typed subjects and the (predicate, object) pairs of every subject
+directly from the elements, without building an intermediate
+rdflib.Graph. Only the striped, nested RDF/XML that SBOL tools write
+is supported. Anything else raises UnsupportedRDFXML so that the
+caller can fall back to the rdflib parser.
+"""
+import collections
+import functools
+import io
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from lxml import etree
+import rdflib
+from rdflib import Literal, URIRef
+
+from .constants import SBOL_DISPLAY_ID, SBOL_PERSISTENT_IDENTITY, SBOL_VERSION
+from .uridict import intern_uri
+
+rdfNS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+
+RDF_TAG = '{' + rdfNS + '}RDF'
+RDF_DESCRIPTION = '{' + rdfNS + '}Description'
+RDF_ABOUT = '{' + rdfNS + '}about'
+RDF_RESOURCE = '{' + rdfNS + '}resource'
+RDF_DATATYPE = '{' + rdfNS + '}datatype'
+RDF_TYPE = rdflib.RDF.type
+
+# Attributes that are allowed on a node element and a property
+# element respectively. Any other attribute (rdf:ID, rdf:nodeID,
+# rdf:parseType, xml:lang, xml:base, property attributes, ...) is
+# outside what the streaming reader handles.
+NODE_ATTRIBUTES = frozenset([RDF_ABOUT])
+PROPERTY_ATTRIBUTES = frozenset([RDF_RESOURCE, RDF_DATATYPE])
+
+PERSISTENT_IDENTITY_TAG = '{' + SBOL_PERSISTENT_IDENTITY.replace('#', '#}')
+DISPLAY_ID_TAG = '{' + SBOL_DISPLAY_ID.replace('#', '#}')
+VERSION_TAG = '{' + SBOL_VERSION.replace('#', '#}')
+
+
+class UnsupportedRDFXML(Exception):
+    """Raised when the input uses RDF/XML features that the streaming
+    reader does not handle."""
+
+
+class ParsedTriples(NamedTuple):
+    # (prefix, namespace) pairs, as returned by rdflib.Graph.namespaces()
+    namespaces: List[Tuple[str, URIRef]]
+    # (subject, rdf type) pairs in document order
+    type_triples: List[Tuple[URIRef, URIRef]]
+    # subject -> list of (predicate, object) pairs
+    subject_triples: Dict[URIRef, List[Tuple[URIRef, rdflib.term.Node]]]
+
+
+class LazyTopLevel(NamedTuple):
+    # The identity and type of a top level node, the properties needed
+    # to infer its resource namespace, the identities of the nodes
+    # nested in it, and the node itself as RDF/XML
+    identity: URIRef
+    rdf_type: URIRef
+    persistent_identity: Optional[str]
+    display_id: Optional[str]
+    version: Optional[str]
+    children: Tuple[URIRef, ...]
+    data: bytes
+
+
+class ScannedTopLevels(NamedTuple):
+    # (prefix, namespace) pairs, as returned by rdflib.Graph.namespaces()
+    namespaces: List[Tuple[str, URIRef]]
+    # Top level nodes that were not parsed, in document order
+    top_levels: List[LazyTopLevel]
+    # The triples of the other nodes, as in ParsedTriples
+    type_triples: List[Tuple[URIRef, URIRef]]
+    subject_triples: Dict[URIRef, List[Tuple[URIRef, rdflib.term.Node]]]
+
+
+def _uri(value, shared=False):
+    # Relative URIs have to be resolved against a base, which is
+    # what the rdflib parser is for.
+    if ':' not in value:
+        raise UnsupportedRDFXML('Relative URI {!r}'.format(value))
+    if shared:
+        # Values that repeat, like roles and references
+        return intern_uri(value)
+    return URIRef(value)
+
+
+@functools.lru_cache(maxsize=4096)
+def _tag_uri(tag):
+    # The URI of an element name, eg a predicate or a type
+    return intern_uri(tag[1:].replace('}', '', 1))
+
+
+def _parse_node(element, type_triples, subject_triples):
+    if not element.keys() or set(element.keys()) - NODE_ATTRIBUTES:
+        raise UnsupportedRDFXML('Unsupported node element {}'.format(element.tag))
+    subject = _uri(element.get(RDF_ABOUT))
+    if element.tag != RDF_DESCRIPTION:
+        type_triples.append((subject, _tag_uri(element.tag)))
+    predicate_objects = subject_triples[subject]
+    for child in element:
+        if not isinstance(child.tag, str):
+            # Skip comments and processing instructions
+            continue
+        if set(child.keys()) - PROPERTY_ATTRIBUTES or child.tag[0] != '{':
+            raise UnsupportedRDFXML('Unsupported property element {}'.format(child.tag))
+        predicate = _tag_uri(child.tag)
+        resource = child.get(RDF_RESOURCE)
+        nodes = [n for n in child if isinstance(n.tag, str)]
+        if resource is not None:
+            if nodes or child.get(RDF_DATATYPE) is not None:
+                raise UnsupportedRDFXML('Malformed property element {}'.format(child.tag))
+            obj = _uri(resource, shared=True)
+        elif nodes:
+            if len(nodes) > 1 or child.get(RDF_DATATYPE) is not None:
+                raise UnsupportedRDFXML('Malformed property element {}'.format(child.tag))
+            obj = _parse_node(nodes[0], type_triples, subject_triples)
+        else:
+            datatype = child.get(RDF_DATATYPE)
+            if datatype is not None:
+                datatype = _uri(datatype, shared=True)
+            obj = Literal(child.text or '', datatype=datatype)
+        if predicate == RDF_TYPE:
+            if not isinstance(obj, URIRef):
+                raise UnsupportedRDFXML('Literal rdf:type on {}'.format(subject))
+            type_triples.append((subject, obj))
+        else:
+            predicate_objects.append((predicate, obj))
+    return subject
+
+
+def _lazy_top_level(element, rdf_type):
+    if not element.keys() or set(element.keys()) - NODE_ATTRIBUTES:
+        raise UnsupportedRDFXML('Unsupported node element {}'.format(element.tag))
+    identity = _uri(element.get(RDF_ABOUT))
+    persistent_identity = display_id = version = None
+    for child in element:
+        if child.tag == PERSISTENT_IDENTITY_TAG:
+            persistent_identity = child.get(RDF_RESOURCE)
+        elif child.tag == DISPLAY_ID_TAG:
+            display_id = child.text
+        elif child.tag == VERSION_TAG:
+            version = child.text
+    children = tuple(_uri(about) for about in
+                     element.xpath('.//*/@rdf:about', namespaces={'rdf': rdfNS}))
+    return LazyTopLevel(identity, rdf_type, persistent_identity, display_id,
+                        version, children,
+                        etree.tostring(element, with_tail=False))
+
+
+def _top_level_elements(source, prefix_graph):
+    # Yield the top level nodes of the document one at a time. The
+    # prefixes of the document are bound in prefix_graph.
+    if isinstance(source, (str, os.PathLike)) and not os.path.isfile(source):
+        # Probably a URL, let rdflib resolve it
+        raise UnsupportedRDFXML('{} is not a local file'.format(source))
+    depth = 0
+    try:
+        for event, item in etree.iterparse(source, events=('start', 'end', 'start-ns'),
+                                           remove_comments=True):
+            if event == 'start-ns':
+                prefix, namespace = item
+                # lxml reports the default namespace with an empty prefix
+                prefix_graph.bind(prefix or None, namespace or '', override=False)
+            elif event == 'start':
+                if depth == 0 and item.tag != RDF_TAG:
+                    raise UnsupportedRDFXML('Root element is not rdf:RDF')
+                if depth == 0 and item.keys():
+                    raise UnsupportedRDFXML('Unsupported rdf:RDF attributes')
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 1:
+                    # A complete top level node. Hand it over, then free
+                    # the memory it and its previous siblings used.
+                    yield item
+                    item.clear()
+                    while item.getprevious() is not None:
+                        del item.getparent()[0]
+    except etree.XMLSyntaxError as e:
+        # Let rdflib report the error
+        raise UnsupportedRDFXML(str(e))
+
+
+def parse_sbol2(source):
+    """Read SBOL2 RDF/XML from a file name or a file-like object of
+    bytes.
+
+    :param source: A file name, or a binary file-like object
+    :return: A ParsedTriples tuple
+    :raises: UnsupportedRDFXML if the input cannot be handled by the
+    streaming reader. The input may or may not be valid RDF/XML.
+    """
+    # Bind prefixes the same way the rdflib parser does so that the
+    # resulting namespaces are identical whichever reader is used.
+    prefix_graph = rdflib.Graph()
+    type_triples = []
+    subject_triples = collections.defaultdict(list)
+    for element in _top_level_elements(source, prefix_graph):
+        _parse_node(element, type_triples, subject_triples)
+    return ParsedTriples(list(prefix_graph.namespaces()), type_triples,
+                         subject_triples)
+
+
+def scan_sbol2(source, defer):
+    """Read SBOL2 RDF/XML from a file name or a file-like object of
+    bytes without parsing the top level nodes whose type is accepted
+    by defer. Those nodes are kept as RDF/XML, to be parsed later with
+    parse_lazy_top_level.
+
+    :param source: A file name, or a binary file-like object
+    :param defer: A function of an rdf type returning True if nodes of
+    that type should not be parsed
+    :return: A ScannedTopLevels tuple
+    :raises: UnsupportedRDFXML if the input cannot be handled by the
+    streaming reader.
+    """
+    prefix_graph = rdflib.Graph()
+    top_levels = []
+    type_triples = []
+    subject_triples = collections.defaultdict(list)
+    for element in _top_level_elements(source, prefix_graph):
+        if element.tag != RDF_DESCRIPTION and element.tag[0] == '{':
+            rdf_type = _tag_uri(element.tag)
+            if defer(rdf_type):
+                top_levels.append(_lazy_top_level(element, rdf_type))
+                continue
+        _parse_node(element, type_triples, subject_triples)
+    return ScannedTopLevels(list(prefix_graph.namespaces()), top_levels,
+                            type_triples, subject_triples)
+
+
+def parse_lazy_top_level(top_level, type_triples, subject_triples):
+    """Parse a top level node returned by scan_sbol2.
+
+    :param top_level: A LazyTopLevel
+    :param type_triples: A list the (subject, rdf type) pairs are
+    appended to
+    :param subject_triples: A mapping of subject to list the
+    (predicate, object) pairs are appended to
+    :return: None
+    :raises: UnsupportedRDFXML if the node cannot be handled by the
+    streaming reader.
+    """
+    _parse_node(etree.fromstring(top_level.data), type_triples,
+                subject_triples)
+
+
+def lazy_top_level_rdfxml(top_level):
+    """Wrap a top level node returned by scan_sbol2 in an RDF/XML
+    document, for parsers other than the streaming reader.
+
+    :param top_level: A LazyTopLevel
+    :return: The RDF/XML document as bytes
+    """
+    return (b'<rdf:RDF xmlns:rdf="' + rdfNS.encode() + b'">' +
+            top_level.data + b'</rdf:RDF>')
+
+
+def parse_sbol2_string(sbol_str):
+    """Read SBOL2 RDF/XML from a string.
+
+    :param sbol_str: A string of RDF/XML
+    :return: A ParsedTriples tuple
+    :raises: UnsupportedRDFXML if the input cannot be handled by the
+    streaming reader.
+    """
+    return parse_sbol2(_string_source(sbol_str))
+
+
+def scan_sbol2_string(sbol_str, defer):
+    """Read SBOL2 RDF/XML from a string, see scan_sbol2.
+
+    :param sbol_str: A string of RDF/XML
+    :param defer: A function of an rdf type returning True if nodes of
+    that type should not be parsed
+    :return: A ScannedTopLevels tuple
+    :raises: UnsupportedRDFXML if the input cannot be handled by the
+    streaming reader.
+    """
+    return scan_sbol2(_string_source(sbol_str), defer)
+
+
+def _string_source(sbol_str):
+    if isinstance(sbol_str, str):
+        sbol_str = sbol_str.encode('utf-8')
+        if sbol_str.lstrip().startswith(b'<?xml') and b'encoding' in sbol_str[:100]:
+            # The declared encoding would no longer match the bytes
+            declaration = sbol_str[:sbol_str.find(b'?>')].lower()
+            if b'utf-8' not in declaration and b'utf8' not in declaration:
+                raise UnsupportedRDFXML('Non UTF-8 string input')
+    return io.BytesIO(sbol_str)
@@ -22,9 +22,11 @@
 #   LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY
 #   OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
 #   SUCH DAMAGE.
-from collections import defaultdict
-from typing import Dict
+from collections.abc import Mapping
+import os
+from typing import Dict, FrozenSet
 
+from deprecated import deprecated
 from lxml import etree
 from lxml.etree import tostring
 from lxml.etree import QName
@@ -32,30 +34,93 @@ from lxml.etree import QName
 from rdflib.namespace import RDF
 from rdflib import URIRef, Literal
 
+from .config import Config
+from .constants import SBOL_IDENTITY
+
 rdfNS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
 sbolNS = "http://sbols.org/v2#"
 
-# This is a module global that is used to register ownership relationships
-# between classes. The serializer uses this to generate structured XML from
-# flat RDF/XML
-OWNERSHIP_PREDICATES: Dict[URIRef, set] = defaultdict(set)
+RDF_ABOUT = QName(rdfNS, 'about')
+RDF_RESOURCE = QName(rdfNS, 'resource')
 
+# The predicates under which each class in
+# Config.SBOL_DATA_MODEL_REGISTER owns child objects, keyed by the
+# class. The serializer uses this to generate structured XML from flat
+# RDF/XML. Each entry is computed once from the OwnedObject
+# declarations of the class and never changes afterwards.
+_OWNERSHIP_SCHEMA: Dict[type, FrozenSet[URIRef]] = {}
+
+
+def ownership_schema(builder):
+    """Return the predicates under which objects built by builder own
+    child objects.
+
+    :param builder: A no-argument constructor from
+    Config.SBOL_DATA_MODEL_REGISTER
+    :return: A frozenset of predicate URIRefs
+    """
+    try:
+        return _OWNERSHIP_SCHEMA[builder]
+    except KeyError:
+        pass
+    obj = builder()
+    schema = frozenset(URIRef(type_uri) for type_uri in obj.owned_objects
+                       if type_uri not in obj._hidden_properties)
+    _OWNERSHIP_SCHEMA[builder] = schema
+    return schema
 
-def is_ownership_relation(triple, subject_type):
-    # subject = triple[0]
-    predicate = triple[1]
-    # object = triple[2]
 
-    return (predicate in OWNERSHIP_PREDICATES and
-            subject_type in OWNERSHIP_PREDICATES[predicate])
+class _OwnershipPredicates(Mapping):
+    """A read-only view of the ownership schemas of the registered
+    classes, mapping each predicate to the RDF types of the classes
+    that own child objects under it.
+    """
 
+    def _predicates(self):
+        predicates = {}
+        for type_uri, builder in list(Config.SBOL_DATA_MODEL_REGISTER.items()):
+            try:
+                schema = ownership_schema(builder)
+            except Exception:
+                # Some registered classes cannot be built without
+                # arguments. They are only serialized if they are used.
+                continue
+            for predicate in schema:
+                predicates.setdefault(predicate, set()).add(URIRef(type_uri))
+        return {predicate: frozenset(parent_types)
+                for predicate, parent_types in predicates.items()}
 
+    def __getitem__(self, predicate):
+        return self._predicates()[URIRef(predicate)]
+
+    def __iter__(self):
+        return iter(self._predicates())
+
+    def __len__(self):
+        return len(self._predicates())
+
+
+# Kept for compatibility, ownership now comes from ownership_schema
+OWNERSHIP_PREDICATES: Mapping = _OwnershipPredicates()
+
+
+@deprecated(reason='Ownership is derived from the OwnedObject properties of '
+                   'the classes in Config.SBOL_DATA_MODEL_REGISTER')
 def register_ownership_relation(parent_type, predicate):
-    # Encapsulates and populates the OWNERSHIP_PREDICATES dictionary.
-    #
-    # :param parent_type: The RDF type of the parent class
-    # :param predicate: The URI for the property.
-    OWNERSHIP_PREDICATES[URIRef(predicate)].add(URIRef(parent_type))
+    """*Deprecated.* Does nothing. Ownership is derived from the
+    OwnedObject properties of registered classes, see
+    ownership_schema.
+    """
+
+
+def is_ownership_relation(triple, subject_type):
+    # subject = triple[0]
+    predicate = triple[1]
+    # object = triple[2]
+    builder = Config.SBOL_DATA_MODEL_REGISTER.get(URIRef(subject_type))
+    if builder is None:
+        return False
+    return predicate in ownership_schema(builder)
 
 
 def ns_prefix_dict(g):
@@ -67,6 +132,7 @@ def serialize_sboll2(g):
     prefixes = ns_prefix_dict(g)
     prefixes['rdf'] = rdfNS
     prefixes['sbol'] = sbolNS
+    qnames = QNameCache(prefixes)
 
     subject_to_element = dict()
     subject_to_type = dict()
@@ -79,16 +145,14 @@ def serialize_sboll2(g):
         the_type = triple[2].toPython()
         if subject in subject_to_element:
             etree.SubElement(subject_to_element[subject],
-                             prefixify(RDF.type, prefixes, True),
+                             qnames.qname(RDF.type),
                              attrib={
-                                 QName(rdfNS, 'resource'): the_type
+                                 RDF_RESOURCE: the_type
                              })
         else:
-            subject_to_element[subject] = etree.Element(prefixify(the_type, prefixes,
-                                                                  True),
+            subject_to_element[subject] = etree.Element(qnames.qname(the_type),
                                                         attrib={
-                                                            QName(rdfNS,
-                                                                  'about'): subject
+                                                            RDF_ABOUT: subject
                                                         }
                                                         )
 
@@ -102,16 +166,16 @@ def serialize_sboll2(g):
         if is_ownership_relation(triple, subject_to_type[triple[0]]):
             owned_element = subject_to_element[obj.toPython()]
             ownership_element = etree.SubElement(element,
-                                                 prefixify(predicate, prefixes, True))
+                                                 qnames.qname(predicate))
             ownership_element.append(owned_element)
             owned_elements.add(obj.toPython())
             continue
         if isinstance(obj, URIRef):
-            etree.SubElement(element, prefixify(predicate, prefixes, True), attrib={
-                QName(rdfNS, 'resource'): obj.toPython()
+            etree.SubElement(element, qnames.qname(predicate), attrib={
+                RDF_RESOURCE: obj.toPython()
             })
         elif isinstance(obj, Literal):
-            elem = etree.SubElement(element, prefixify(predicate, prefixes, True))
+            elem = etree.SubElement(element, qnames.qname(predicate))
             elem.text = obj
         else:
             raise Exception()
@@ -126,13 +190,174 @@ def serialize_sboll2(g):
     return tostring(doc, pretty_print=True)
 
 
+def serialize_sbol2_objects(objects, prefixes):
+    """Serialize SBOL objects to nested RDF/XML directly from the
+    object tree, without building an intermediate rdflib.Graph.
+
+    :param objects: The top level SBOLObjects to serialize, in order
+    :param prefixes: A dictionary of prefix, namespace pairs
+    :return: The RDF/XML as bytes
+    """
+    prefixes = dict(prefixes)
+    prefixes['rdf'] = rdfNS
+    prefixes['sbol'] = sbolNS
+    qnames = QNameCache(prefixes)
+    objects = list(objects)
+    owned_objects = set()
+    elements = [object_element(obj, qnames, owned_objects) for obj in objects]
+    doc = etree.Element(QName(rdfNS, 'RDF'), nsmap=prefixes)
+    for obj, element in zip(objects, elements):
+        # An object can be owned by an object that comes later in
+        # the list, in which case it is nested there instead
+        if id(obj) not in owned_objects:
+            doc.append(element)
+    return tostring(doc, pretty_print=True)
+
+
+def write_sbol2_objects(objects, prefixes, output):
+    """Write SBOL objects as nested RDF/XML to a file, one top level
+    element at a time. Only the element being written is held in
+    memory, not the whole document. The output is the same as that of
+    serialize_sbol2_objects.
+
+    :param objects: The top level SBOLObjects to serialize, in order
+    :param prefixes: A dictionary of prefix, namespace pairs
+    :param output: A file name or a binary file-like object
+    :return: None
+    """
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, 'wb') as out:
+            write_sbol2_objects(objects, prefixes, out)
+        return
+    prefixes = dict(prefixes)
+    prefixes['rdf'] = rdfNS
+    prefixes['sbol'] = sbolNS
+    qnames = QNameCache(prefixes)
+    objects = list(objects)
+    # Objects that are nested inside another object are written there
+    owned_objects = set()
+    for obj in objects:
+        _collect_owned_objects(obj, owned_objects)
+    # The rdf:RDF element is written first, so the prefixes of all the
+    # namespaces are created up front, in the order that building the
+    # elements would create them
+    for obj in objects:
+        _create_prefixes(obj, qnames)
+    end_tag = b'</rdf:RDF>\n'
+    start_tag = None
+    for obj in objects:
+        if id(obj) in owned_objects:
+            continue
+        # Serialize the element in an rdf:RDF element of its own, which
+        # declares the namespaces, and write only the element
+        doc = etree.Element(QName(rdfNS, 'RDF'), nsmap=prefixes)
+        doc.append(object_element(obj, qnames, set()))
+        data = tostring(doc, pretty_print=True)
+        start = data.index(b'>') + 2
+        if start_tag is None:
+            start_tag = data[:start]
+            output.write(start_tag)
+        output.write(data[start:-len(end_tag)])
+    if start_tag is None:
+        output.write(tostring(etree.Element(QName(rdfNS, 'RDF'), nsmap=prefixes),
+                              pretty_print=True))
+    else:
+        output.write(end_tag)
+
+
+def _create_prefixes(obj, qnames):
+    # Resolve the IRIs that object_element resolves, in the same order
+    qnames.qname(obj.rdf_type)
+    hidden_properties = obj._hidden_properties
+    for type_uri in obj.properties:
+        if type_uri in hidden_properties or type_uri == SBOL_IDENTITY:
+            continue
+        qnames.qname(type_uri)
+    for type_uri, object_store in obj.owned_objects.items():
+        if type_uri in hidden_properties:
+            continue
+        qnames.qname(type_uri)
+        for owned_obj in {id(o): o for o in object_store}.values():
+            _create_prefixes(owned_obj, qnames)
+
+
+def _collect_owned_objects(obj, owned_objects):
+    for type_uri, object_store in obj.owned_objects.items():
+        if type_uri in obj._hidden_properties:
+            continue
+        for owned_obj in object_store:
+            owned_objects.add(id(owned_obj))
+            _collect_owned_objects(owned_obj, owned_objects)
+
+
+def object_element(obj, qnames, owned_objects):
+    """Build the RDF/XML element of an SBOL object, with the elements
+    of its owned objects nested inside.
+
+    :param obj: An SBOLObject
+    :param qnames: The QNameCache of the serialization. New prefixes
+    are added to it for namespaces that are not yet known.
+    :param owned_objects: A set that the id of every nested object is
+    added to
+    :return: An lxml Element
+    """
+    element = etree.Element(qnames.qname(obj.rdf_type),
+                            attrib={RDF_ABOUT: str(obj.identity)})
+    hidden_properties = obj._hidden_properties
+    for type_uri, values in obj.properties.items():
+        if type_uri in hidden_properties or type_uri == SBOL_IDENTITY:
+            continue
+        tag = qnames.qname(type_uri)
+        # Duplicate values are written once, as they are in a graph
+        for value in dict.fromkeys(values):
+            if isinstance(value, URIRef):
+                etree.SubElement(element, tag, attrib={
+                    RDF_RESOURCE: str(value)
+                })
+            elif isinstance(value, Literal):
+                elem = etree.SubElement(element, tag)
+                elem.text = value
+            else:
+                raise Exception()
+    for type_uri, object_store in obj.owned_objects.items():
+        if type_uri in hidden_properties:
+            continue
+        tag = qnames.qname(type_uri)
+        for owned_obj in {id(o): o for o in object_store}.values():
+            ownership_element = etree.SubElement(element, tag)
+            ownership_element.append(object_element(owned_obj, qnames,
+                                                    owned_objects))
+            owned_objects.add(id(owned_obj))
+    return element
+
+
 def prefixify(iri, prefixes, create_new):
-    for prefix in prefixes:
-        prefix_iri = prefixes[prefix]
-        if iri.startswith(prefix_iri):
-            return QName(prefix_iri, iri[len(prefix_iri):])
+    """Convert an IRI to a QName using the longest matching namespace
+    in prefixes.
+
+    To convert many IRIs with the same prefixes use a QNameCache,
+    which sorts the namespaces once and remembers the QNames.
+
+    :param iri: The IRI to convert
+    :param prefixes: A dictionary of prefix, namespace pairs
+    :param create_new: If True and no namespace matches, add a new
+    nsN prefix for the namespace of the IRI to prefixes
+    :return: A QName, or the IRI if it could not be converted
+    """
+    # Among prefixes that map to the same namespace the first one in
+    # the dictionary wins, as in QNameCache
+    namespace = max((namespace for namespace in prefixes.values()
+                     if iri.startswith(namespace)), key=len, default=None)
+    if namespace is not None:
+        return QName(namespace, iri[len(namespace):])
     if not create_new:
         return iri
+    return _new_prefix(iri, prefixes)
+
+
+def _new_prefix(iri, prefixes):
+    # Add a new nsN prefix for the namespace of iri and return its
+    # QName, or return iri if it has no namespace
     fragment_start = iri.rfind('#')
     if fragment_start == -1:
         fragment_start = iri.rfind('/')
@@ -146,3 +371,49 @@ def prefixify(iri, prefixes, create_new):
             prefixes[prefix_name] = iri_prefix
             return QName(iri_prefix, iri[len(iri_prefix):])
         i = i + 1
+
+
+class QNameCache:
+    """Resolves IRIs to QNames for the lifetime of one serialization.
+
+    Each IRI is resolved once and the same QName object is returned
+    for it afterwards. Namespaces are matched longest first.
+    """
+
+    def __init__(self, prefixes):
+        """
+        :param prefixes: A dictionary of prefix, namespace pairs. It is
+        updated in place when new prefixes are created.
+        """
+        self.prefixes = prefixes
+        self._qnames = {}
+        self._sort_namespaces()
+
+    def _sort_namespaces(self):
+        # Longest first so that the first match is the longest. The
+        # sort is stable, so among prefixes that map to the same
+        # namespace the first one in the dictionary wins.
+        self._namespaces = sorted(self.prefixes.values(), key=len, reverse=True)
+
+    def qname(self, iri):
+        """Return the QName of iri, creating a prefix for its namespace
+        if there is none yet.
+        """
+        try:
+            return self._qnames[iri]
+        except KeyError:
+            pass
+        qname = self.resolve(iri, True)
+        self._qnames[iri] = qname
+        return qname
+
+    def resolve(self, iri, create_new):
+        for namespace in self._namespaces:
+            if iri.startswith(namespace):
+                return QName(namespace, iri[len(namespace):])
+        if not create_new:
+            return iri
+        qname = _new_prefix(iri, self.prefixes)
+        if qname is not iri:
+            self._sort_namespaces()
+        return qname
@@ -1,4 +1,3 @@
-import posixpath
 from typing import Union
 
 from rdflib import URIRef
@@ -284,19 +283,8 @@ class ComponentDefinition(TopLevel):
         # Instantiate a Component for each ComponentDefinition in the list
         instance_list = []
         for cdef in component_list:
-
-            # Generate URI of new Component.  Check if an object with that URI is
-            # already instantiated.
-            instance_count = 0
-            component_id = self.persistentIdentity + "/" + cdef.displayId + "_" \
-                + str(instance_count) + "/" + self.version
-            while self.find(component_id):
-                # Find the last instance assigned
-                instance_count += 1
-                component_id = self.persistentIdentity + "/" + cdef.displayId + "_" \
-                    + str(instance_count) + "/" + self.version
-
-            c = self.components.create(cdef.displayId + "_" + str(instance_count))
+            # Use the first displayId not already taken by an object in self
+            c = self.components.create(self.components.next_free_id(cdef.displayId))
             c.definition = cdef.identity
             instance_list.append(c)
         return component_list
@@ -351,11 +339,7 @@ class ComponentDefinition(TopLevel):
             self.sequenceConstraints.clear()
         for upstream, downstream in zip(primary_structure_components[:-1],
                                         primary_structure_components[1:]):
-            instance_count = 0
-            constraint_id = 'constraint_%d' % instance_count
-            while constraint_id in self.sequenceConstraints:
-                instance_count += 1
-                constraint_id = 'constraint_%d' % instance_count
+            constraint_id = self.sequenceConstraints.next_free_id('constraint')
             sc = self.sequenceConstraints.create(constraint_id)
             sc.subject = upstream
             sc.object = downstream
@@ -366,7 +350,9 @@ class ComponentDefinition(TopLevel):
         into a nucleotide sequence.
 
         If no Sequence object is associated with this ComponentDefinition,
-        one will be automatically instantiated
+        one will be automatically instantiated. Subcomponents that have
+        not changed since they were last compiled are taken from the
+        compile cache of the Document.
         :return: A string representing the nucleotide sequence
         for this ComponentDefinition.
         """
@@ -401,6 +387,23 @@ class ComponentDefinition(TopLevel):
         """
         return self.getPrimaryStructureComponents()
 
+    def _precedes_constraints(self):
+        # The precedes SequenceConstraints of this ComponentDefinition
+        # by subject and by object, each a dict of Component identity
+        # -> constraints in store order. Kept in the index of the
+        # sequenceConstraints store, so they are rebuilt only after
+        # the constraints change.
+        index = self.sequenceConstraints._store_index()
+        if index.precedes is None:
+            by_subject = {}
+            by_object = {}
+            for sc in index.store:
+                if sc.restriction == SBOL_RESTRICTION_PRECEDES:
+                    by_subject.setdefault(str(sc.subject), []).append(sc)
+                    by_object.setdefault(str(sc.object), []).append(sc)
+            index.precedes = (by_subject, by_object)
+        return index.precedes
+
     def hasUpstreamComponent(self, component):
         """Checks if the specified Component has a Component upstream
         in linear arrangement on the DNA strand.
@@ -414,11 +417,8 @@ class ComponentDefinition(TopLevel):
                             'Cannot determine upstream Component. '
                             'Self has no SequenceConstraints')
         else:
-            for sc in self.sequenceConstraints:
-                if sc.object == component.identity and \
-                      sc.restriction == SBOL_RESTRICTION_PRECEDES:
-                    return True
-            return False
+            by_subject, by_object = self._precedes_constraints()
+            return str(component.identity) in by_object
 
     def getUpstreamComponent(self, component):
         """Get the upstream component.
@@ -431,12 +431,10 @@ class ComponentDefinition(TopLevel):
                             'Cannot get upstream Component. Self '
                             'has no SequenceConstraints')
         else:
-            upstream_component_id = None
-            for sc in self.sequenceConstraints:
-                if sc.object == component.identity and \
-                      sc.restriction == SBOL_RESTRICTION_PRECEDES:
-                    upstream_component = self.components[sc.subject]
-                    return upstream_component
+            by_subject, by_object = self._precedes_constraints()
+            constraints = by_object.get(str(component.identity))
+            if constraints:
+                return self.components[constraints[0].subject]
         raise SBOLError(SBOLErrorCode.SBOL_ERROR_END_OF_LIST,
                         'This component has no upstream '
                         'component. Use hasUpstreamComponent to catch this error')
@@ -454,11 +452,8 @@ class ComponentDefinition(TopLevel):
                             'Cannot determine upstream Component. '
                             'Self has no SequenceConstraints')
         else:
-            for sc in self.sequenceConstraints:
-                if sc.subject == component.identity and \
-                      sc.restriction == SBOL_RESTRICTION_PRECEDES:
-                    return True
-            return False
+            by_subject, by_object = self._precedes_constraints()
+            return str(component.identity) in by_subject
 
     def getDownstreamComponent(self, component):
         """Get the downstream component.
@@ -471,12 +466,10 @@ class ComponentDefinition(TopLevel):
                             'Cannot get downstream Component. '
                             'Self has no SequenceConstraints')
         else:
-            upstream_component_id = None
-            for sc in self.sequenceConstraints:
-                if sc.subject == component.identity and \
-                      sc.restriction == SBOL_RESTRICTION_PRECEDES:
-                    upstream_component = self.components[sc.object]
-                    return upstream_component
+            by_subject, by_object = self._precedes_constraints()
+            constraints = by_subject.get(str(component.identity))
+            if constraints:
+                return self.components[constraints[0].object]
         raise SBOLError(SBOLErrorCode.SBOL_ERROR_END_OF_LIST,
                         'This component has no downstream '
                         'component. Use hasDownstreamComponent to catch this error')
@@ -489,6 +482,7 @@ class ComponentDefinition(TopLevel):
             msg = msg % (self.identity, upstream_component.identity)
             raise ValueError(msg)
         primary_structure = self.getPrimaryStructureComponents()
+        by_subject, by_object = self._precedes_constraints()
         if upstream_component.identity == primary_structure[-1].identity:
             msg = 'Deletion failed. No Components were found downstream of %s'
             msg = msg % upstream_component.identity
@@ -499,10 +493,8 @@ class ComponentDefinition(TopLevel):
         downstream_sequence_constraint = None
         for c_upstream, c_downstream in zip(primary_structure[:-1],
                                             primary_structure[1:]):
-            for sc in self.sequenceConstraints:
-                if (sc.subject == c_upstream.identity and
-                        sc.object == c_downstream.identity and
-                        sc.restriction == SBOL_RESTRICTION_PRECEDES):
+            for sc in by_subject.get(str(c_upstream.identity), ()):
+                if sc.object == c_downstream.identity:
                     upstream_sequence_constraint = downstream_sequence_constraint
                     downstream_sequence_constraint = sc
             if downstream_component:
@@ -526,6 +518,7 @@ class ComponentDefinition(TopLevel):
             msg = msg % downstream_component.identity
             raise ValueError(msg)
         primary_structure = self.getPrimaryStructureComponents()
+        by_subject, by_object = self._precedes_constraints()
         if downstream_component.identity == primary_structure[0].identity:
             msg = 'Deletion failed. Component %s does not have an upstream component'
             msg = msg % downstream_component.identity
@@ -535,10 +528,8 @@ class ComponentDefinition(TopLevel):
         downstream_sequence_constraint = None
         for c_upstream, c_downstream in zip(primary_structure[:-1],
                                             primary_structure[1:]):
-            for sc in self.sequenceConstraints:
-                if (sc.subject == c_upstream.identity and
-                        sc.object == c_downstream.identity and
-                        sc.restriction == SBOL_RESTRICTION_PRECEDES):
+            for sc in by_subject.get(str(c_upstream.identity), ()):
+                if sc.object == c_downstream.identity:
                     upstream_sequence_constraint = downstream_sequence_constraint
                     downstream_sequence_constraint = sc
             if c_downstream.identity == downstream_component.identity:
@@ -574,44 +565,24 @@ class ComponentDefinition(TopLevel):
         # Search for an existing SequenceConstraint between upstream
         # and downstream Component
         target_constraint = None
-        for sc in self.sequenceConstraints:
-            if (sc.object == downstream.identity and
-                    sc.restriction == SBOL_RESTRICTION_PRECEDES):
-                if target_constraint is not None:
-                    # If more than one downstream component has been specified,
-                    # then it is ambiguous where the insert should be placed,
-                    # so throw an error
-                    msg = 'SequenceConstraints are ambiguous. The target component'
-                    msg += ' may have more than one downstream component specified'
-                    raise ValueError(msg)
-                target_constraint = sc
-        # Generate URI of a Component to be created.  Check if an object with
-        # that URI is already instantiated.
-        instance_count = 0
-        component_id = posixpath.join(self.persistentIdentity,
-                                      f'{insert.displayId}_{instance_count}',
-                                      self.version)
-        while self.find(component_id):
-            instance_count += 1
-            component_id = posixpath.join(self.persistentIdentity,
-                                          f'{insert.displayId}_{instance_count}',
-                                          self.version)
-        # Auto-construct the new Component
-        c_insert = self.components.create(f'{insert.displayId}_{instance_count}')
+        by_subject, by_object = self._precedes_constraints()
+        for sc in by_object.get(str(downstream.identity), ()):
+            if target_constraint is not None:
+                # If more than one downstream component has been specified,
+                # then it is ambiguous where the insert should be placed,
+                # so throw an error
+                msg = 'SequenceConstraints are ambiguous. The target component'
+                msg += ' may have more than one downstream component specified'
+                raise ValueError(msg)
+            target_constraint = sc
+        # Auto-construct the new Component, with the first displayId not
+        # already taken by an object in self
+        c_insert = self.components.create(self.components.next_free_id(insert.displayId))
         c_insert.definition = insert.identity
-        # Generate URI of new SequenceConstraint. Check if an object with
-        # that URI is already instantiated.
-        instance_count = 0
-        sc_id = posixpath.join(self.persistentIdentity,
-                               f'constraint_{instance_count}',
-                               self.version)
-        while self.find(sc_id):
-            instance_count += 1
-            sc_id = posixpath.join(self.persistentIdentity,
-                                   f'constraint_{instance_count}',
-                                   self.version)
+        component_id = c_insert.identity
         # Auto-construct the new SequenceConstraint
-        sc_new = self.sequenceConstraints.create(f'constraint_{instance_count}')
+        sc_id = self.sequenceConstraints.next_free_id('constraint')
+        sc_new = self.sequenceConstraints.create(sc_id)
         sc_new.subject = component_id
         sc_new.object = downstream.identity
         sc_new.restriction = SBOL_RESTRICTION_PRECEDES
@@ -642,44 +613,24 @@ class ComponentDefinition(TopLevel):
         # Search for an existing SequenceConstraint between upstream
         # and downstream Component
         target_constraint = None
-        for sc in self.sequenceConstraints:
-            if (sc.subject == upstream.identity and
-                    sc.restriction == SBOL_RESTRICTION_PRECEDES):
-                if target_constraint is not None:
-                    # If more than one downstream component has been specified,
-                    # then it is ambiguous where the insert should be placed,
-                    # so throw an error
-                    msg = 'SequenceConstraints are ambiguous. The target component'
-                    msg += ' may have more than one downstream component specified'
-                    raise ValueError(msg)
-                target_constraint = sc
-        # Generate URI of a Component to be created.  Check if an object with
-        # that URI is already instantiated.
-        instance_count = 0
-        component_id = posixpath.join(self.persistentIdentity,
-                                      f'{insert.displayId}_{instance_count}',
-                                      self.version)
-        while self.find(component_id):
-            instance_count += 1
-            component_id = posixpath.join(self.persistentIdentity,
-                                          f'{insert.displayId}_{instance_count}',
-                                          self.version)
-        # Auto-construct the new Component
-        c_insert = self.components.create(f'{insert.displayId}_{instance_count}')
+        by_subject, by_object = self._precedes_constraints()
+        for sc in by_subject.get(str(upstream.identity), ()):
+            if target_constraint is not None:
+                # If more than one downstream component has been specified,
+                # then it is ambiguous where the insert should be placed,
+                # so throw an error
+                msg = 'SequenceConstraints are ambiguous. The target component'
+                msg += ' may have more than one downstream component specified'
+                raise ValueError(msg)
+            target_constraint = sc
+        # Auto-construct the new Component, with the first displayId not
+        # already taken by an object in self
+        c_insert = self.components.create(self.components.next_free_id(insert.displayId))
         c_insert.definition = insert.identity
-        # Generate URI of new SequenceConstraint. Check if an object with
-        # that URI is already instantiated.
-        instance_count = 0
-        sc_id = posixpath.join(self.persistentIdentity,
-                               f'constraint_{instance_count}',
-                               self.version)
-        while self.find(sc_id):
-            instance_count += 1
-            sc_id = posixpath.join(self.persistentIdentity,
-                                   f'constraint_{instance_count}',
-                                   self.version)
+        component_id = c_insert.identity
         # Auto-construct the new SequenceConstraint
-        sc_new = self.sequenceConstraints.create(f'constraint_{instance_count}')
+        sc_id = self.sequenceConstraints.next_free_id('constraint')
+        sc_new = self.sequenceConstraints.create(sc_id)
         sc_new.subject = upstream.identity
         sc_new.object = component_id
         sc_new.restriction = SBOL_RESTRICTION_PRECEDES
@@ -703,8 +654,13 @@ class ComponentDefinition(TopLevel):
 
         arbitrary_component = self.components[0]
         next_component = arbitrary_component
+        visited = set()
         while self.hasUpstreamComponent(next_component):
+            visited.add(id(next_component))
             next_component = self.getUpstreamComponent(next_component)
+            if id(next_component) in visited:
+                raise ValueError('The SequenceConstraints of ComponentDefinition '
+                                 '<%s> form a cycle.' % self.identity)
         return next_component
 
     def getLastComponent(self):
@@ -723,8 +679,13 @@ class ComponentDefinition(TopLevel):
 
         arbitrary_component = self.components[0]
         next_component = arbitrary_component
+        visited = set()
         while self.hasDownstreamComponent(next_component):
+            visited.add(id(next_component))
             next_component = self.getDownstreamComponent(next_component)
+            if id(next_component) in visited:
+                raise ValueError('The SequenceConstraints of ComponentDefinition '
+                                 '<%s> form a cycle.' % self.identity)
         return next_component
 
     def applyToComponentHierarchy(self, callback=None, user_data=None):
@@ -744,6 +705,10 @@ class ComponentDefinition(TopLevel):
         """Get the primary sequence of a design in terms of its sequentially ordered
         Components.
 
+        The sequence starts from the first Component upstream of the first
+        Component in components. Components that the precedes
+        SequenceConstraints do not connect to it are not included.
+
         :return: A list of Components.
         """
         subcomponents = []
@@ -756,7 +721,21 @@ class ComponentDefinition(TopLevel):
                 raise ValueError('ComponentDefinition <%s> does not appear to describe'
                                  'a complete primary structure. It appears to be '
                                  'missing SequenceConstraints.' % self.identity)
-
+            by_subject, by_object = self._precedes_constraints()
+            # Identical constraints name the same neighbor
+            for constraints, neighbor in ((by_subject, 'object'),
+                                          (by_object, 'subject')):
+                for uri, component_constraints in constraints.items():
+                    neighbors = {str(getattr(sc, neighbor))
+                                 for sc in component_constraints}
+                    if len(neighbors) > 1:
+                        raise ValueError('ComponentDefinition <%s> does not describe a '
+                                         'linear primary structure. Component <%s> '
+                                         'has more than one neighbor on one side.'
+                                         % (self.identity, uri))
+
+            # getFirstComponent raises an error if the constraints form
+            # a cycle
             c_first = self.getFirstComponent()
             subcomponents.append(c_first)
             c_next = c_first
@@ -933,12 +912,7 @@ class ComponentDefinition(TopLevel):
         """
 
         def autoconstruct_id(sbol_owned_object_property, display_id):
-            instance_count = 0
-            auto_id = '%s_%d' % (display_id, instance_count)
-            while sbol_owned_object_property.find(auto_id):
-                instance_count += 1
-                auto_id = '%s_%d' % (display_id, instance_count)
-            return auto_id
+            return sbol_owned_object_property.next_free_id(display_id)
 
         if not self.doc:
             msg = 'Integration failed.'
@@ -1,4 +1,5 @@
 from enum import Enum
+import logging
 from typing import Any
 import warnings
 
@@ -11,6 +12,7 @@ class FileFormats(Enum):
     JSON = 'json'
     NTRIPLES = 'ntriples'
     RDFXML = 'rdfxml'
+    TURTLE = 'turtle'
 
 
 class ConfigOptions(Enum):
@@ -70,7 +72,7 @@ valid_options = {
     ConfigOptions.SBOL_COMPLIANT_URIS.value: {True, False},
     ConfigOptions.SBOL_TYPED_URIS.value: {True, False},
     ConfigOptions.SERIALIZATION_FORMAT.value: {'sbol', 'rdfxml',
-                                               'json', 'ntriples'},
+                                               'json', 'ntriples', 'turtle'},
     ConfigOptions.VALIDATE.value: {True, False},
     ConfigOptions.VALIDATE_ONLINE.value: {True, False},
     ConfigOptions.LANGUAGE.value: {'SBOL2', 'FASTA', 'GenBank'},
@@ -94,6 +96,8 @@ home = None
 SBOLCompliantTypes = 1
 catch_exceptions = 0
 file_format = 'rdfxml'
+# The library's logger, see get_logger
+_logger = None
 
 
 class Config:
@@ -154,17 +158,23 @@ class Config:
 
     @staticmethod
     def setFileFormat(_file_format):
-        """
+        """Set the file format used by Document.read, write, readString
+        and writeString. 'rdfxml' (the default), 'ntriples' and 'turtle'
+        are supported. Any other value selects RDF/XML.
 
         :param _file_format: The file format to use.
         :return: None
         """
         # must declare that we're assigning to a global variable
         global file_format
+        if isinstance(_file_format, FileFormats):
+            _file_format = _file_format.value
         if _file_format == FileFormats.JSON.value:
             file_format = FileFormats.JSON.value
         elif _file_format == FileFormats.NTRIPLES.value:
             file_format = FileFormats.NTRIPLES.value
+        elif _file_format == FileFormats.TURTLE.value:
+            file_format = FileFormats.TURTLE.value
         else:
             file_format = FileFormats.RDFXML.value
 
@@ -369,3 +379,17 @@ def string_equal(str1: Any, str2: Any) -> bool:
     or a rdflib.Literal.
     """
     return str(str1) == str(str2)
+
+
+def get_logger() -> logging.Logger:
+    """Returns the 'sbol2' logger. The first time it is requested, if
+    nobody has initialized logging, logging is configured here so we
+    have a chance of seeing the messages.
+    """
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger('sbol2')
+        if not logger.hasHandlers():
+            logging.basicConfig()
+        _logger = logger
+    return _logger
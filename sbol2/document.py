@@ -9,6 +9,7 @@ import warnings
 from deprecated import deprecated
 from rdflib import URIRef
 
+from . import SBOL2Parse
 from . import SBOL2Serialize
 from . import validation
 from .attachment import Attachment
@@ -21,6 +22,7 @@ from .config import Config
 from .config import parseClassName
 from . import config
 from .config import parsePropertyName
+from .config import string_equal
 from .constants import *
 from .dbtl import Analysis, Build, Design, SampleRoster, Test
 from .experiment import Experiment, ExperimentalData
@@ -35,7 +37,7 @@ from .module import Module
 from .moduledefinition import ModuleDefinition
 from .object import SBOLObject
 from .participation import Participation
-from .property import OwnedObject, URIProperty
+from .property import OwnedObject, URIProperty, _search_segments
 from .provo import Plan, Activity, Agent, Usage, Association
 from .sbolerror import SBOLError
 from .sbolerror import SBOLErrorCode
@@ -43,7 +45,7 @@ from .sequence import Sequence
 from .sequenceannotation import SequenceAnnotation
 from .sequenceconstraint import SequenceConstraint
 from .toplevel import TopLevel
-from .uridict import URIDict
+from .uridict import URIDict, intern_uri, uri_key
 from .validator import do_validation  # local libSBOLj wrapper
 
 import requests
@@ -85,6 +87,13 @@ Config.SBOL_DATA_MODEL_REGISTER = {
     URIRef(SBOL_VARIABLE_COMPONENT): VariableComponent
 }
 
+# The rdflib parser and serializer names for the line-oriented file
+# formats. Every other file format is read and written as RDF/XML.
+RDFLIB_FILE_FORMATS = {
+    config.FileFormats.NTRIPLES.value: 'nt',
+    config.FileFormats.TURTLE.value: 'turtle',
+}
+
 
 class Document(Identified):
     """
@@ -115,9 +124,53 @@ class Document(Identified):
         self.objectCache = {}  # Needed?
 
         # The keys in SBOLObjects are URIRefs because our internal
-        # representations use rdflib types.
+        # representations use rdflib types. Top levels read lazily
+        # are only in SBOLObjects once they are built.
         # self.SBOLObjects: Dict[rdflib.URIRef, SBOLObject] = {}
         self.SBOLObjects = URIDict()
+        # Every object in the Document, top level or not, keyed by
+        # identity. Maintained by add, OwnedObject and the parser so
+        # that find does not have to search the object tree.
+        self._identity_index = {}
+        # Indexed objects whose identity changed, to index again under
+        # the new identity. See _identity_changing.
+        self._renamed = {}
+        # Property value -> {id: object} for the objects having that
+        # value, built on demand by referrers, and the values each
+        # object is indexed under. Objects that changed since are
+        # indexed again the next time it is used.
+        self._referrers = None
+        self._referrer_values = {}
+        self._changed_referrers = {}
+        # update_graph rebuilds self.graph from scratch when it is
+        # stale. Otherwise only the top levels that changed since the
+        # last update are rebuilt. _graph_subjects maps each top level
+        # to the subjects of the triples it wrote to the graph.
+        self._graph_stale = True
+        self._graph_namespaces = {}
+        self._graph_subjects = {}
+        self._dirty_top_levels = {}
+        # Top levels read lazily and not built yet, keyed by identity,
+        # and the top level containing each of their child objects
+        self._lazy_top_levels = URIDict()
+        self._lazy_children = URIDict()
+        # The lazily read top levels by segment of their identity, eg
+        # their displayId, and by persistentIdentity, so a lookup only
+        # builds the ones it could match. Entries for top levels that
+        # were built since are skipped.
+        self._lazy_segments = {}
+        self._lazy_persistent_identities = {}
+        # Sequence URI -> ComponentDefinitions that use it, built on
+        # demand by definitions_using_sequence. ComponentDefinitions
+        # that changed since are reindexed the next time it is used.
+        self._sequence_definitions = None
+        self._definition_sequences = {}
+        self._changed_definitions = {}
+        # The number of changes to each top level, keyed by id, and
+        # the compiled Sequences keyed by ComponentDefinition identity.
+        # See Sequence.compile.
+        self._change_counts = {}
+        self._compile_cache = URIDict()
 
         self._namespaces = {}
         self.resource_namespaces = set()
@@ -178,6 +231,9 @@ class Document(Identified):
     def compare(self, other):
         # Let the super class do the bulk of the comparison. Super
         # compares owned objects and properties.
+        self._materialize_all()
+        if isinstance(other, Document):
+            other._materialize_all()
         if not super().compare(other):
             return False
         if self._namespaces != other._namespaces:
@@ -214,6 +270,8 @@ class Document(Identified):
         """
         # Check for uniqueness of URI
         identity_uri = sbol_obj.identity
+        if self._lazy_top_levels:
+            self._materialize_uri(identity_uri)
         if identity_uri in self.SBOLObjects:
             raise SBOLError(SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE,
                             'Cannot add ' + sbol_obj.identity +
@@ -230,6 +288,11 @@ class Document(Identified):
                 # eg. componentDefinitions, moduleDefinitions, etc.
                 self.owned_objects[type_uri].append(sbol_obj)
             sbol_obj.doc = self
+            self._object_changed(sbol_obj)
+            if sbol_obj.is_top_level() or sbol_obj.parent is not None:
+                # A child object without a parent cannot be reached
+                # from the Document, so it is not indexed
+                self._identity_index[rdflib.URIRef(identity_uri)] = sbol_obj
             # Notify the object that it has been added
             sbol_obj._added_to_document(self)
             # Recurse into child objects and set their back-pointer to this Document
@@ -237,11 +300,111 @@ class Document(Identified):
                 for child_obj in obj_store:
                     if child_obj.doc != self:
                         self.add(child_obj)
+                    elif key not in sbol_obj._hidden_properties:
+                        self._index_object(child_obj)
+
+    def _index_object(self, sbol_obj):
+        # Register an object and its children in the identity index.
+        # Objects in hidden properties are top levels that are indexed
+        # on their own.
+        self._object_changed(sbol_obj)
+        self._index_tree(sbol_obj)
+
+    def _index_tree(self, sbol_obj):
+        self._identity_index[rdflib.URIRef(sbol_obj.identity)] = sbol_obj
+        if self._referrers is not None:
+            self._changed_referrers[id(sbol_obj)] = sbol_obj
+        for rdf_type, object_store in sbol_obj.owned_objects.items():
+            if rdf_type in sbol_obj._hidden_properties:
+                continue
+            for child_obj in object_store:
+                self._index_tree(child_obj)
+
+    def _unindex_object(self, sbol_obj):
+        # Remove an object and its children from the identity index
+        self._object_changed(sbol_obj)
+        self._unindex_tree(sbol_obj)
+
+    def _unindex_tree(self, sbol_obj):
+        identity = rdflib.URIRef(sbol_obj.identity)
+        if self._identity_index.get(identity) is sbol_obj:
+            del self._identity_index[identity]
+        self._renamed.pop(id(sbol_obj), None)
+        if self._referrers is not None:
+            self._changed_referrers[id(sbol_obj)] = sbol_obj
+        for rdf_type, object_store in sbol_obj.owned_objects.items():
+            if rdf_type in sbol_obj._hidden_properties:
+                continue
+            for child_obj in object_store:
+                self._unindex_tree(child_obj)
+
+    def _identity_changing(self, sbol_obj):
+        # Called by Property before the identity of an object changes.
+        # The new identity is not known yet, so the object is indexed
+        # under it the next time the index is used.
+        identity = rdflib.URIRef(sbol_obj.identity)
+        if self._identity_index.get(identity) is sbol_obj:
+            del self._identity_index[identity]
+            self._renamed[id(sbol_obj)] = sbol_obj
+
+    def _index_renamed(self):
+        renamed = list(self._renamed.values())
+        self._renamed.clear()
+        for sbol_obj in renamed:
+            # An object already indexed under the new identity keeps it
+            self._identity_index.setdefault(rdflib.URIRef(sbol_obj.identity), sbol_obj)
+
+    def _object_changed(self, sbol_obj):
+        # Called when an object in this Document, or one of its
+        # properties, changes. Marks the object to be indexed again by
+        # referrers and the top level containing it so update_graph
+        # rebuilds its triples.
+        if sbol_obj is self:
+            return
+        if self._referrers is not None:
+            self._changed_referrers[id(sbol_obj)] = sbol_obj
+        if (self._sequence_definitions is not None
+                and isinstance(sbol_obj, ComponentDefinition)):
+            self._changed_definitions[id(sbol_obj)] = sbol_obj
+        top_level = sbol_obj
+        while (top_level.parent is not None and top_level.parent is not self
+               and not top_level.is_top_level()):
+            top_level = top_level.parent
+        self._dirty_top_levels[id(top_level)] = top_level
+        self._change_counts[id(top_level)] = self._change_counts.get(id(top_level), 0) + 1
 
     def add_list(self, sbol_objs):
         for obj in sbol_objs:
             self.add(obj)
 
+    def add_many(self, sbol_objs):
+        """
+        Register several objects in the Document.
+
+        This is equivalent to calling add for each object, except that
+        the identities of all the top level objects are checked before
+        any of them is added. If one is not unique the Document is left
+        unchanged.
+
+        :param sbol_objs: An iterable of SBOL objects
+        :return: None
+        """
+        sbol_objs = list(sbol_objs)
+        identities = set()
+        for sbol_obj in sbol_objs:
+            if not sbol_obj.is_top_level():
+                continue
+            identity_uri = str(sbol_obj.identity)
+            if (identity_uri in identities or identity_uri in self.SBOLObjects
+                    or identity_uri in self._lazy_top_levels):
+                raise SBOLError(SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE,
+                                'Cannot add ' + identity_uri +
+                                ' to Document. An object with this identity '
+                                'is already contained in the Document')
+            identities.add(identity_uri)
+        for sbol_obj in sbol_objs:
+            self.add(sbol_obj)
+
     def addNamespace(self, namespace, prefix):
         """Add a new namespace to the Document.
 
@@ -357,6 +520,8 @@ class Document(Identified):
         :rtype: SBOLObject
         :raises: SBOLError if the given uri is not found
         """
+        if uri not in self.SBOLObjects and self._lazy_top_levels:
+            self._materialize_uri(uri)
         try:
             return self.SBOLObjects[uri]
         except KeyError:
@@ -394,14 +559,22 @@ class Document(Identified):
     # File I/O #
     def write(self, filename):
         """
-        Serialize all objects in this Document to an RDF/XML file.
+        Serialize all objects in this Document to a file. The file is
+        written as RDF/XML unless another format has been selected with
+        Config.setFileFormat.
 
         :param filename: The full name of the file you want to write
         (including file extension).
         :return: A string with the validation results,
         or empty string if validation is disabled.
         """
-        self.doc_serialize_rdf2xml(filename)
+        rdflib_format = RDFLIB_FILE_FORMATS.get(Config.getFileFormat())
+        if rdflib_format is None:
+            self.doc_serialize_rdf2xml(filename)
+        else:
+            self.update_graph()
+            self.graph.serialize(destination=filename, format=rdflib_format,
+                                 encoding='utf-8')
         # Optionally validate
         result = 'Validation disabled. To enable use of validation, use'
         result += ' Config.setOption(ConfigOptions.VALIDATE, True)'
@@ -413,29 +586,36 @@ class Document(Identified):
                 print(f'Validation request took {t_end - t_start} seconds')
         return result
 
-    def read(self, filename):
+    def read(self, filename, lazy: bool = False):
         """
-        Read an RDF/XML file and attach the SBOL objects to this Document.
+        Read a file and attach the SBOL objects to this Document. The file
+        is read as RDF/XML unless another format has been selected with
+        Config.setFileFormat.
 
         Existing contents of the Document will be wiped.
         :param filename: The full name of the file you want to read
         (including file extension).
+        :param lazy: Boolean indicating whether to build top level
+        objects only when they are first used, see append
         :return: None
         """
         self.clear()
-        self.append(filename, overwrite=False)
+        self.append(filename, overwrite=False, lazy=lazy)
 
-    def readString(self, sbol_str):
-        """Read an RDF/XML string and attach the SBOL objects to
-        this Document.
+    def readString(self, sbol_str, lazy: bool = False):
+        """Read a string and attach the SBOL objects to this
+        Document. The string is read as RDF/XML unless another format
+        has been selected with Config.setFileFormat.
 
         Existing contents of the Document will be wiped.
 
         :param sbol_str: A string formatted in SBOL.
+        :param lazy: Boolean indicating whether to build top level
+        objects only when they are first used, see append
         :return: None
         """
         self.clear()
-        self.appendString(sbol_str, overwrite=False)
+        self.appendString(sbol_str, overwrite=False, lazy=lazy)
 
     def writeString(self):
         """
@@ -443,36 +623,123 @@ class Document(Identified):
 
         :return: A string representation of the objects in this Document.
         """
-        # Save any changes we've made to the graph.
-        self.update_graph()
+        rdflib_format = RDFLIB_FILE_FORMATS.get(Config.getFileFormat())
+        if rdflib_format is not None:
+            # Save any changes we've made to the graph.
+            self.update_graph()
+            result = self.graph.serialize(format=rdflib_format)
+            if isinstance(result, bytes):
+                # rdflib < 6 returns bytes
+                result = result.decode('utf-8')
+            return result
         # Write graph to string
-        rdf = SBOL2Serialize.serialize_sboll2(self.graph).decode('utf-8')
-        return rdf
+        return self._serialize_rdfxml()
+
+    def _serialize_rdfxml(self):
+        # Serialize to an RDF/XML string, whatever the configured file
+        # format. The validator only accepts RDF/XML. The XML is built
+        # from the objects, self.graph is not updated.
+        self._materialize_all()
+        rdf = SBOL2Serialize.serialize_sbol2_objects(self.SBOLObjects.values(),
+                                                     self._namespace_prefixes())
+        return rdf.decode('utf-8')
+
+    def _namespace_prefixes(self):
+        # The namespace bindings that update_graph would give the graph,
+        # including the ones rdflib binds by default.
+        graph = rdflib.Graph()
+        for prefix, ns in self._namespaces.items():
+            graph.bind(prefix, ns)
+        return SBOL2Serialize.ns_prefix_dict(graph)
 
-    def append(self, filename, overwrite: bool = False):
+    def append(self, filename, overwrite: bool = False, lazy: bool = False):
         """
-        Read an RDF/XML file and attach the SBOL objects to this Document.
+        Read a file and attach the SBOL objects to this Document. The file
+        is read as RDF/XML unless another format has been selected with
+        Config.setFileFormat.
 
         New objects will be added to the existing contents of the Document.
+
+        When lazy is True, the top level objects of the SBOL core
+        classes are not built while the file is read. Their identities
+        and RDF/XML are kept instead, and each is built the first time
+        it is used, for example by get, find or its property of the
+        Document, eg componentDefinitions. Operations on the whole
+        Document, like write, len or find_property_value, build all of
+        them. SBOLObjects only contains the objects that are built.
+        Objects are added to their property of the Document in the
+        order they are built. Lazy reading requires RDF/XML that the streaming reader
+        supports, otherwise the file is read in full.
         :param filename: The full name of the file you want to read
         (including file extension).
         :param overwrite: Boolean indicating whether to overwrite existing objects
+        :param lazy: Boolean indicating whether to build top level
+        objects only when they are first used
         :return: None
         """
+        rdflib_format = RDFLIB_FILE_FORMATS.get(Config.getFileFormat())
+        if rdflib_format is not None:
+            new_graph = rdflib.Graph()
+            new_graph.parse(filename, format=rdflib_format)
+            self._append_graph(new_graph, overwrite)
+            return
+        try:
+            if lazy:
+                parsed = SBOL2Parse.scan_sbol2(filename, self._defer_top_level)
+            else:
+                parsed = SBOL2Parse.parse_sbol2(filename)
+        except SBOL2Parse.UnsupportedRDFXML as e:
+            self.logger.debug('Falling back to rdflib parser: %s', e)
+        else:
+            if lazy:
+                self._append_scanned(parsed, overwrite)
+            else:
+                self._append_parsed(parsed, overwrite)
+            return
         new_graph = rdflib.Graph()
         new_graph.parse(filename, format='application/rdf+xml')
         self._append_graph(new_graph, overwrite)
 
-    def appendString(self, sbol_str: str, overwrite: bool = False):
+    def appendString(self, sbol_str: str, overwrite: bool = False,
+                     lazy: bool = False):
         """
-        Read an RDF/XML document from a string and attach the SBOL
-        objects to this Document.
+        Read a document from a string and attach the SBOL objects to
+        this Document. The string is read as RDF/XML unless another
+        format has been selected with Config.setFileFormat.
 
         New objects will be added to the existing contents of the Document.
         :param sbol_str: A string of RDF/XML
         :param overwrite: Boolean indicating whether to overwrite existing objects
+        :param lazy: Boolean indicating whether to build top level
+        objects only when they are first used, see append
         :return: None
         """
+        rdflib_format = RDFLIB_FILE_FORMATS.get(Config.getFileFormat())
+        if rdflib_format is not None:
+            new_graph = rdflib.Graph()
+            new_graph.parse(data=sbol_str, format=rdflib_format)
+            self._append_graph(new_graph, overwrite)
+            return
+        self._append_rdfxml(sbol_str, overwrite, lazy)
+
+    def _append_rdfxml(self, sbol_str, overwrite: bool = False, lazy: bool = False):
+        # Read an RDF/XML string, whatever the configured file format.
+        # Used for RDF/XML from the validator, SynBioHub and the
+        # library itself.
+        try:
+            if lazy:
+                parsed = SBOL2Parse.scan_sbol2_string(sbol_str,
+                                                      self._defer_top_level)
+            else:
+                parsed = SBOL2Parse.parse_sbol2_string(sbol_str)
+        except SBOL2Parse.UnsupportedRDFXML as e:
+            self.logger.debug('Falling back to rdflib parser: %s', e)
+        else:
+            if lazy:
+                self._append_scanned(parsed, overwrite)
+            else:
+                self._append_parsed(parsed, overwrite)
+            return
         # ------------------------------------------------------------
         # Load the new data into a graph
         new_graph = rdflib.Graph()
@@ -480,13 +747,166 @@ class Document(Identified):
         self._append_graph(new_graph, overwrite)
 
     def _append_graph(self, new_graph: rdflib.Graph, overwrite: bool):
+        identities = (s for s, _, _ in
+                      new_graph.triples((None, rdflib.RDF.type, None)))
+        self._clear_overwritten_objects(identities, overwrite)
+        # Make the new graph be the graph we parse
+        self.graph = new_graph
+        # Load the new graph into the existing document
+        self.parse_all()
+
+    def _append_parsed(self, parsed: SBOL2Parse.ParsedTriples, overwrite: bool):
+        # The streaming reader does not build a graph. The triples are
+        # rebuilt from the objects by update_graph when they are needed,
+        # only the namespace bindings are kept here.
+        identities = (s for s, _ in parsed.type_triples)
+        self._clear_overwritten_objects(identities, overwrite)
+        self.graph = rdflib.Graph()
+        for prefix, ns in parsed.namespaces:
+            self.graph.bind(prefix, ns, override=False)
+        self.parse_grouped_triples(parsed.namespaces, parsed.type_triples,
+                                   parsed.subject_triples)
+
+    def _append_scanned(self, scanned: SBOL2Parse.ScannedTopLevels, overwrite: bool):
+        # The top levels that the streaming reader did not parse are
+        # registered here and built by _materialize when they are used
+        identities = [s for s, _ in scanned.type_triples]
+        for top_level in scanned.top_levels:
+            identities.append(top_level.identity)
+            identities.extend(top_level.children)
+        overwritten = self._clear_overwritten_objects(identities, overwrite)
+        self.graph = rdflib.Graph()
+        for prefix, ns in scanned.namespaces:
+            self.graph.bind(prefix, ns, override=False)
+        for top_level in scanned.top_levels:
+            self._lazy_top_levels[top_level.identity] = top_level
+            for child in top_level.children:
+                self._lazy_children[child] = top_level.identity
+            for segment in set(str(top_level.identity).split('/')):
+                self._lazy_segments.setdefault(segment, []).append(top_level)
+            if top_level.persistent_identity:
+                self._lazy_persistent_identities.setdefault(
+                    str(top_level.persistent_identity), []).append(top_level)
+            self._infer_resource_namespace(top_level.identity,
+                                           top_level.persistent_identity,
+                                           top_level.display_id,
+                                           top_level.version,
+                                           top_level.rdf_type)
+        # Objects that were cleared for overwriting are filled in
+        # from the new data right away
+        for obj in overwritten:
+            self._materialize_uri(obj.identity)
+        self.parse_grouped_triples(scanned.namespaces, scanned.type_triples,
+                                   scanned.subject_triples)
+
+    @staticmethod
+    def _defer_top_level(rdf_type):
+        # Only top levels of registered classes are read lazily. Other
+        # nodes may be annotation objects that have to be linked to
+        # the objects that refer to them when the file is read.
+        builder = Config.SBOL_DATA_MODEL_REGISTER.get(rdf_type)
+        return isinstance(builder, type) and issubclass(builder, TopLevel)
+
+    def _materialize_uri(self, uri):
+        # Build the lazily read top level that is or contains the
+        # object with the given identity. Returns False if there is
+        # no such top level.
+        top_level = self._lazy_top_levels.get(uri)
+        if top_level is None:
+            identity = self._lazy_children.get(uri)
+            if identity is None:
+                return False
+            top_level = self._lazy_top_levels[identity]
+        self._materialize([top_level])
+        return True
+
+    def _materialize_type(self, rdf_type, uri=None):
+        # Build the lazily read top levels of a type, or only those
+        # that a lookup of uri in its property could match: by
+        # identity, persistentIdentity, displayId or another
+        # SBOL-compliant URI formed from it
+        if uri is None:
+            top_levels = self._lazy_top_levels.values()
+        else:
+            uri = str(uri)
+            segment_matches = min((self._lazy_segments.get(segment, ())
+                                   for segment in _search_segments(uri)), key=len)
+            top_levels = {}
+            for top_level in (self._lazy_persistent_identities.get(uri, []) +
+                              list(segment_matches)):
+                if self._lazy_top_levels.get(top_level.identity) is top_level:
+                    top_levels[id(top_level)] = top_level
+            top_levels = top_levels.values()
+        self._materialize([top_level for top_level in top_levels
+                           if string_equal(top_level.rdf_type, rdf_type)])
+
+    def _materialize_all(self):
+        if self._lazy_top_levels:
+            self._materialize(list(self._lazy_top_levels.values()))
+
+    def _materialize(self, top_levels):
+        # Build the objects of top levels that were read lazily. This
+        # is the part of parse_grouped_triples that applies to them.
+        if not top_levels:
+            return
+        type_triples = []
+        subject_triples = collections.defaultdict(list)
+        for top_level in top_levels:
+            del self._lazy_top_levels[top_level.identity]
+            for child in top_level.children:
+                self._lazy_children.pop(child, None)
+            node_types = []
+            node_triples = collections.defaultdict(list)
+            try:
+                SBOL2Parse.parse_lazy_top_level(top_level, node_types, node_triples)
+            except SBOL2Parse.UnsupportedRDFXML as e:
+                self.logger.debug('Falling back to rdflib parser: %s', e)
+                node_types.clear()
+                node_triples.clear()
+                graph = rdflib.Graph()
+                graph.parse(data=SBOL2Parse.lazy_top_level_rdfxml(top_level),
+                            format='application/rdf+xml')
+                self._group_triples(graph, node_types, node_triples)
+            type_triples.extend(node_types)
+            for subject, predicate_objects in node_triples.items():
+                subject_triples[subject].extend(predicate_objects)
+        if not self._lazy_top_levels:
+            self._lazy_segments.clear()
+            self._lazy_persistent_identities.clear()
+        self._drop_referrers()
+        self._sequence_definitions = None
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        for s, o in type_triples:
+            self.parse_objects_inner(s, o, debug)
+        for s, predicate_objects in subject_triples.items():
+            self.parse_subject_properties(s, predicate_objects)
+        # Remove child objects from SBOLObjects once they have a parent
+        objects = []
+        annotation_objects = []
+        for s, _ in type_triples:
+            so = self.SBOLObjects.get(s)
+            if so is None:
+                continue
+            objects.append(so)
+            if isinstance(so, TopLevel):
+                continue
+            if so.parent:
+                del self.SBOLObjects[s]
+            else:
+                annotation_objects.append(so)
+        if annotation_objects:
+            # Annotation objects are referred to from within their
+            # own top level
+            referrers = self._build_referrers(objects)
+            self._link_annotation_objects(annotation_objects,
+                                          lambda uri: list(referrers.get(uri, ())),
+                                          debug)
+
+    def _clear_overwritten_objects(self, identities, overwrite: bool):
         # Gather all the objects that will be overwritten, stopping
-        # if the user says not to overwrite. If we clear as we go we lose
+        # if the user says not to overwrite. Returns the objects. If we clear as we go we lose
         # the ability to find objects within objects. So gather the list
         # here, and clear them as a second pass.
-        objects_to_clear = []
-        identities = (s for s, _, _ in
-                      new_graph.triples((None, rdflib.RDF.type, None)))
         objects = (self.find(identity) for identity in identities)
         objects_to_clear = [obj for obj in objects if obj is not None]
         if overwrite is False and objects_to_clear:
@@ -500,7 +920,14 @@ class Document(Identified):
         # they will be overwritten. Keep the identity property because it
         # does not get restored by the graph parsing. Keep all the keys in
         # the internal stores so owned objects end up in the right place.
+        # Children that are not in the new data are no longer part of
+        # the Document, so drop them from the identity index. The
+        # objects that get reused are indexed again.
+        self._drop_referrers()
+        for existing_object in objects_to_clear:
+            self._unindex_object(existing_object)
         for existing_object in objects_to_clear:
+            self._identity_index[rdflib.URIRef(existing_object.identity)] = existing_object
             if existing_object.identity not in self.SBOLObjects:
                 self.SBOLObjects[existing_object.identity] = existing_object
             # Now clear the object. It will get reconstituted below by parse_all
@@ -511,24 +938,20 @@ class Document(Identified):
                 existing_object.properties[k] = []
             for k in existing_object.owned_objects:
                 existing_object.owned_objects[k] = []
-        # Make the new graph be the graph we parse
-        self.graph = new_graph
-        # Load the new graph into the existing document
-        self.parse_all()
+        return objects_to_clear
 
     def parse_all(self):
-        # Parse namespaces
-        self.logger.debug("*** Reading in namespaces (graph): ")
-        for ns in self.graph.namespaces():
-            self.logger.debug(ns)
-            self._namespaces[ns[0]] = ns[1]
-        if self.logger.isEnabledFor(logging.DEBUG):
-            self.logger.debug("*** Internal namespaces data structure: ")
-            for ns in self._namespaces:
-                self.logger.debug(ns)
-        # Instantiate all objects with an RDF type
-        for s, _, o in self.graph.triples((None, rdflib.RDF.type, None)):
-            self.parse_objects_inner(s, o)
+        # Group the triples by subject in a single pass over the
+        # graph. Type triples are kept in order so that objects are
+        # instantiated exactly as they would be triple by triple.
+        type_triples = []
+        subject_triples = collections.defaultdict(list)
+        self._group_triples(self.graph, type_triples, subject_triples)
+        self.parse_grouped_triples(self.graph.namespaces(), type_triples,
+                                   subject_triples)
+
+    @staticmethod
+    def _group_triples(graph, type_triples, subject_triples):
         # Find the graph base uri.  This is the location of the sbol
         # file, and begins with the "file://" scheme.  Any URI in the
         # file without a scheme will appear relative to this URI, after
@@ -540,15 +963,51 @@ class Document(Identified):
         if pos != -1:
             pos += 1
         rdf_type = rdflib.RDF.type
-        for result_s, result_p, result_o in self.graph:
-            # Look for properties
-            if result_p != rdf_type:
-                obj = result_o
-                if isinstance(result_o, URIRef) and pos != -1:
-                    if obj[:pos] == graphBaseURIStr:
-                        # This was a URI without a scheme.  Remove URI base
-                        obj = URIRef(obj[pos:])
-                self.parse_properties_inner(result_s, result_p, obj)
+        for s, p, o in graph:
+            if p == rdf_type:
+                type_triples.append((s, o))
+                continue
+            if isinstance(o, URIRef):
+                if pos != -1 and o[:pos] == graphBaseURIStr:
+                    # This was a URI without a scheme.  Remove URI base
+                    o = o[pos:]
+                o = intern_uri(o)
+            subject_triples[s].append((intern_uri(p), o))
+
+    def parse_grouped_triples(self, namespaces, type_triples, subject_triples):
+        """Load triples that have been grouped by subject into this
+        Document.
+
+        :param namespaces: An iterable of (prefix, namespace) pairs
+        :param type_triples: A list of (subject, rdf type) pairs
+        :param subject_triples: A mapping of subject to a list of
+        (predicate, object) pairs
+        :return: None
+        """
+        # Objects are populated directly below
+        self._drop_referrers()
+        self._sequence_definitions = None
+        self._compile_cache.clear()
+        self._graph_stale = True
+        # Check the log level once rather than for every object
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        # Parse namespaces
+        if debug:
+            self.logger.debug("*** Reading in namespaces (graph): ")
+        for ns in namespaces:
+            if debug:
+                self.logger.debug(ns)
+            self._namespaces[ns[0]] = ns[1]
+        if debug:
+            self.logger.debug("*** Internal namespaces data structure: ")
+            for ns in self._namespaces:
+                self.logger.debug(ns)
+        # Instantiate all objects with an RDF type
+        for s, o in type_triples:
+            self.parse_objects_inner(s, o, debug)
+        # Build the properties and owned objects of each subject in bulk
+        for s, predicate_objects in subject_triples.items():
+            self.parse_subject_properties(s, predicate_objects)
 
         # Remove objects from SBOLObjects if they are not TopLevel AND
         # they have a parent object.
@@ -564,14 +1023,15 @@ class Document(Identified):
                 # SBOLObjects
                 del self.SBOLObjects[k]
                 continue
-            self.logger.debug('Orphan %r', so)
+            if debug:
+                self.logger.debug('Orphan %r', so)
 
         # Handle the annotation objects
-        self.parse_annotation_objects()
+        self.parse_annotation_objects(debug)
         # Dress document
         self.dress_document()
 
-    def parse_objects_inner(self, subject, obj):
+    def parse_objects_inner(self, subject, obj, debug=None):
         # Construct the top-level object if we haven't already done so
         # and its type is something we know about.
         if subject not in self.SBOLObjects and obj in Config.SBOL_DATA_MODEL_REGISTER:
@@ -580,7 +1040,9 @@ class Document(Identified):
             if isinstance(new_obj, Identified):
                 # Clear out the version. it will get set later
                 new_obj.version = ''
-            if self.logger.isEnabledFor(logging.DEBUG):
+            if debug is None:
+                debug = self.logger.isEnabledFor(logging.DEBUG)
+            if debug:
                 self.logger.debug("New object type: " + str(type(new_obj)))
                 self.logger.debug("New object attrs: " + str(vars(new_obj)))
             # Wipe default property values passed from default
@@ -591,6 +1053,7 @@ class Document(Identified):
             new_obj.identity = subject
             # Update document
             self.SBOLObjects[new_obj.identity] = new_obj
+            self._identity_index[subject] = new_obj
             new_obj.doc = self
             # For now, set the parent to the Document.
             # This may get overwritten later for child objects.
@@ -608,6 +1071,7 @@ class Document(Identified):
             new_obj.identity = subject
             new_obj.rdf_type = obj
             self.SBOLObjects[new_obj.identity] = new_obj
+            self._identity_index[subject] = new_obj
             new_obj.doc = self
 
     def parse_properties_inner(self, subject, predicate, obj):
@@ -616,6 +1080,7 @@ class Document(Identified):
         if found == -1:
             found = predicate.rfind('/')
         if found != -1:
+            predicate = uri_key(predicate)
             # Checks if the object's property already exists
             if subject in self.SBOLObjects:
                 parent = self.SBOLObjects[subject]
@@ -640,27 +1105,234 @@ class Document(Identified):
                 msg = msg.format(subject, type(subject))
                 self.logger.debug(msg)
 
+    def parse_subject_properties(self, subject, predicate_objects):
+        """Add all the (predicate, object) pairs of a single subject to
+        the corresponding SBOLObject. This is equivalent to calling
+        parse_properties_inner once per triple, but each predicate is
+        only classified once and its values are stored in bulk.
+
+        :param subject: The identity of the object being populated
+        :param predicate_objects: A list of (predicate, object) pairs
+        :return: None
+        """
+        if subject not in self.SBOLObjects:
+            msg = 'Subject {} ({}) not found in my SBOLObjects'
+            msg = msg.format(subject, type(subject))
+            self.logger.debug(msg)
+            return
+        parent = self.SBOLObjects[subject]
+        # Group the values by predicate, dropping duplicates but
+        # otherwise preserving their order
+        values_by_predicate = {}
+        for predicate, obj in predicate_objects:
+            values_by_predicate.setdefault(predicate, {})[obj] = None
+        for predicate, values in values_by_predicate.items():
+            if predicate.rfind('#') == -1 and predicate.rfind('/') == -1:
+                continue
+            predicate = uri_key(predicate)
+            if predicate in parent.properties:
+                # triples are properties
+                store = parent.properties[predicate]
+                if store:
+                    existing = set(store)
+                    store.extend(v for v in values if v not in existing)
+                else:
+                    store.extend(values)
+            elif predicate in parent.owned_objects:
+                # triples are owned objects
+                store = parent.owned_objects[predicate]
+                seen = {id(o) for o in store}
+                for obj in values:
+                    owned_obj = self.SBOLObjects[obj]
+                    if owned_obj is not None and id(owned_obj) not in seen:
+                        seen.add(id(owned_obj))
+                        store.append(owned_obj)
+                        owned_obj.parent = parent
+            else:
+                # Extension data
+                parent.properties[predicate] = list(values)
+
+    def find_property(self, uri):
+        self._materialize_all()
+        return super().find_property(uri)
+
+    def find_property_value(self, uri, value, matches=None):
+        self._materialize_all()
+        return super().find_property_value(uri, value, matches)
+
     def find_reference(self, uri):
         """Find objects that reference the given URI. Returns a list of
         objects. The list will be empty if no references were found.
 
         """
-        references = []
-        for obj in self.SBOLObjects.values():
-            references.extend(obj.find_reference(uri))
-        return references
-
-    def parse_annotation_objects(self):
+        return self.referrers(uri)
+
+    def referrers(self, uri):
+        """Find the objects in this Document that have the given URI as
+        a property value, for example the ComponentDefinitions that
+        use a Sequence, or the Components whose definition is a
+        ComponentDefinition.
+
+        The lookup uses a reverse reference index that is built the
+        first time it is needed. Objects that changed since are indexed
+        again, so the time taken by a lookup after an edit depends on
+        the objects edited rather than on the size of the Document.
+
+        :param uri: The URI to look for, a str or an rdflib term
+        :return: A list of SBOLObjects, empty if there are no referrers
+        """
+        # Top levels read lazily since the index was built are indexed
+        # as changed objects when they are built
+        self._materialize_all()
+        if self._referrers is None:
+            if self._renamed:
+                self._index_renamed()
+            self._referrers = {}
+            self._referrer_values.clear()
+            self._changed_referrers.clear()
+            for obj in self._identity_index.values():
+                self._index_referrer(obj)
+        elif self._changed_referrers:
+            self._update_referrers()
+        if not isinstance(uri, rdflib.term.Identifier):
+            uri = rdflib.URIRef(uri)
+        return list(self._referrers.get(uri, {}).values())
+
+    def _drop_referrers(self):
+        # The reverse reference index is built again when it is used
+        self._referrers = None
+        self._referrer_values.clear()
+        self._changed_referrers.clear()
+
+    def _index_referrer(self, obj):
+        values = set()
+        for property_uri, property_values in obj.properties.items():
+            if property_uri != SBOL_IDENTITY:
+                # An object does not refer to itself
+                values.update(property_values)
+        for value in values:
+            self._referrers.setdefault(value, {})[id(obj)] = obj
+        self._referrer_values[id(obj)] = values
+
+    def _update_referrers(self):
+        # Remove the changed objects from the index under their old
+        # values, then add the ones still in this Document under their
+        # current values
+        if self._renamed:
+            self._index_renamed()
+        changed = list(self._changed_referrers.values())
+        self._changed_referrers.clear()
+        for obj in changed:
+            for value in self._referrer_values.pop(id(obj), ()):
+                objs = self._referrers[value]
+                del objs[id(obj)]
+                if not objs:
+                    del self._referrers[value]
+            if self._identity_index.get(rdflib.URIRef(obj.identity)) is obj:
+                self._index_referrer(obj)
+
+    def _build_referrers(self, objects):
+        referrers = collections.defaultdict(list)
+        seen = set()
+
+        def visit(obj):
+            if id(obj) in seen:
+                return
+            seen.add(id(obj))
+            for object_store in obj.owned_objects.values():
+                for child_obj in object_store:
+                    visit(child_obj)
+            for property_uri, values in obj.properties.items():
+                if property_uri == SBOL_IDENTITY:
+                    # An object does not refer to itself
+                    continue
+                for value in set(values):
+                    referrers[value].append(obj)
+
+        for obj in objects:
+            visit(obj)
+        return referrers
+
+    def definitions_using_sequence(self, uri):
+        """Find the ComponentDefinitions in this Document whose
+        sequences include the given Sequence.
+
+        The lookup uses an index that is built the first time it is
+        needed and updated as ComponentDefinitions change.
+
+        :param uri: The identity of the Sequence
+        :return: A list of ComponentDefinitions, empty if the Sequence
+        is not used
+        """
+        if self._lazy_top_levels:
+            self._materialize_type(SBOL_COMPONENT_DEFINITION)
+        if self._sequence_definitions is None:
+            self._sequence_definitions = {}
+            self._definition_sequences.clear()
+            changed = [obj for obj in self.SBOLObjects.values()
+                       if isinstance(obj, ComponentDefinition)]
+        else:
+            changed = list(self._changed_definitions.values())
+        self._changed_definitions.clear()
+        for cd in changed:
+            for sequence_uri in self._definition_sequences.pop(id(cd), ()):
+                definitions = self._sequence_definitions[sequence_uri]
+                del definitions[id(cd)]
+                if not definitions:
+                    del self._sequence_definitions[sequence_uri]
+            if cd.doc is not self:
+                continue
+            sequence_uris = tuple(dict.fromkeys(
+                uri_key(sequence_uri) for sequence_uri in
+                cd.properties.get(SBOL_SEQUENCE_PROPERTY, ())))
+            for sequence_uri in sequence_uris:
+                self._sequence_definitions.setdefault(sequence_uri, {})[id(cd)] = cd
+            self._definition_sequences[id(cd)] = sequence_uris
+        return list(self._sequence_definitions.get(uri_key(uri), {}).values())
+
+    def compile_all(self):
+        """Compile the Sequence of every root ComponentDefinition in
+        this Document, that is every ComponentDefinition with
+        subcomponents that is not itself the definition of a Component.
+
+        The compiled subtrees are cached, so a ComponentDefinition
+        shared by several roots is assembled once.
+
+        :return: A dictionary mapping the identity of each root to
+        its compiled elements
+        """
+        self._materialize_all()
+        definitions = [obj for obj in self.SBOLObjects.values()
+                       if isinstance(obj, ComponentDefinition)]
+        subcomponent_definitions = set()
+        for cd in definitions:
+            for c in cd.components:
+                subcomponent_definitions.add(uri_key(c.definition))
+        compiled = {}
+        for cd in definitions:
+            if len(cd.components) and uri_key(cd.identity) not in subcomponent_definitions:
+                compiled[cd.identity] = cd.compile()
+        return compiled
+
+    def parse_annotation_objects(self, debug=None):
         """Parse leftover objects from reading and link them up where they
         belong. These are usually extension-type objects.
 
         """
-        for uri, obj in self.SBOLObjects.items():
-            self.logger.debug('Possible annotation object %s', obj.identity)
+        if debug is None:
+            debug = self.logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            for uri, obj in self.SBOLObjects.items():
+                self.logger.debug('Possible annotation object %s', obj.identity)
         annotation_objects = [obj for obj in self.SBOLObjects.values()
                               if not isinstance(obj, TopLevel)]
+        self._link_annotation_objects(annotation_objects, self.find_reference,
+                                      debug)
+
+    def _link_annotation_objects(self, annotation_objects, find_reference, debug):
         for ao in annotation_objects:
-            self.logger.debug('Annotation object: %s', ao.identity)
+            if debug:
+                self.logger.debug('Annotation object: %s', ao.identity)
             if SBOL_PERSISTENT_IDENTITY in ao.properties:
                 # Copy to a new TopLevel object
                 tl = TopLevel(type_uri=ao.type, version=None)
@@ -671,6 +1343,8 @@ class Document(Identified):
                 tl.doc = self
                 tl_identity_uri = rdflib.URIRef(tl.identity)
                 self.SBOLObjects[tl_identity_uri] = tl
+                self._identity_index[tl_identity_uri] = tl
+                self._drop_referrers()
             else:
                 # Determine the RDF type of the member property that
                 # contains this kind of annotation object
@@ -684,7 +1358,7 @@ class Document(Identified):
                 self.logger.debug('anno property name = %r', property_name)
                 property_uri = rdflib.URIRef(posixpath.join(ns, property_name))
                 self.logger.debug('anno property uri = %r', property_uri)
-                matches = self.find_reference(ao_identity_uri)
+                matches = find_reference(ao_identity_uri)
                 self.logger.debug('Found %d references', len(matches))
                 matches = [m for m in matches if property_uri in m.properties]
                 self.logger.debug('Found %d good references', len(matches))
@@ -709,25 +1383,31 @@ class Document(Identified):
                     # SBOLObjects
                     ao_identity_uri = rdflib.URIRef(ao.identity)
                     del self.SBOLObjects[ao_identity_uri]
+        # Annotation objects were moved and their references removed
+        self._drop_referrers()
 
     def infer_resource_namespaces(self):
         for obj in self.SBOLObjects.values():
             if not isinstance(obj, Identified):
                 continue
-            if not (obj.persistentIdentity and obj.displayId and obj.version):
-                continue
-            # if object identity ends with compliant suffix, extract the
-            # start as a namespace
-            uri = obj.identity
-            compliant_suffix = posixpath.join(posixpath.sep, obj.displayId,
-                                              obj.version)
-            if uri.endswith(compliant_suffix):
-                self.resource_namespaces.add(uri[0:-len(compliant_suffix)])
-                continue
-            typed_suffix = posixpath.join(posixpath.sep, parseClassName(obj.rdf_type),
-                                          obj.displayId, obj.version)
-            if uri.endswith(typed_suffix):
-                self.resource_namespaces.add(uri[0:-len(typed_suffix)])
+            self._infer_resource_namespace(obj.identity, obj.persistentIdentity,
+                                           obj.displayId, obj.version,
+                                           obj.rdf_type)
+
+    def _infer_resource_namespace(self, uri, persistent_identity, display_id,
+                                  version, rdf_type):
+        if not (persistent_identity and display_id and version):
+            return
+        # if object identity ends with compliant suffix, extract the
+        # start as a namespace
+        compliant_suffix = posixpath.join(posixpath.sep, display_id, version)
+        if uri.endswith(compliant_suffix):
+            self.resource_namespaces.add(uri[0:-len(compliant_suffix)])
+            return
+        typed_suffix = posixpath.join(posixpath.sep, parseClassName(rdf_type),
+                                      display_id, version)
+        if uri.endswith(typed_suffix):
+            self.resource_namespaces.add(uri[0:-len(typed_suffix)])
 
     def dress_document(self):
         self.infer_resource_namespaces()
@@ -759,6 +1439,19 @@ class Document(Identified):
         # Properties to keep, which don't make sense to clear
         keepers = [SBOL_VERSION]
         self.SBOLObjects.clear()
+        self._identity_index.clear()
+        self._renamed.clear()
+        self._lazy_top_levels.clear()
+        self._lazy_children.clear()
+        self._lazy_segments.clear()
+        self._lazy_persistent_identities.clear()
+        self._store_indexes = None
+        self._id_counters = None
+        self._drop_referrers()
+        self._sequence_definitions = None
+        self._change_counts.clear()
+        self._compile_cache.clear()
+        self._graph_stale = True
         for name, value in self.properties.items():
             if name in keepers:
                 # Do not erase properties on the keepers list
@@ -798,29 +1491,51 @@ class Document(Identified):
         :param outfile: output file
         :return: None
         """
-        self.update_graph()
-        rdf = SBOL2Serialize.serialize_sboll2(self.graph).decode('utf-8')
-        self.logger.debug("RDF: " + rdf)
-        self.logger.debug("TYPE: " + str(type(rdf)))
-        with open(outfile, 'w') as out:
-            out.write(rdf)
-            out.flush()
+        # Stream the top level objects to the file one at a time
+        # rather than building the whole document in memory
+        self._materialize_all()
+        with open(outfile, 'wb') as out:
+            SBOL2Serialize.write_sbol2_objects(self.SBOLObjects.values(),
+                                               self._namespace_prefixes(), out)
 
     def update_graph(self):
         """
         Update the RDF triples representation of data.
         :return:
         """
-        self.graph = rdflib.Graph()
+        self._materialize_all()
+        if self._graph_stale or self._graph_namespaces != self._namespaces:
+            self.graph = rdflib.Graph()
+            self._graph_subjects.clear()
+            self._dirty_top_levels.clear()
+            # ASSUMPTION: Document does not have properties. Is this a valid assumption?
+            for obj in self.SBOLObjects.values():
+                self._add_to_graph(obj)
+            self._graph_stale = False
+        elif self._dirty_top_levels:
+            # Retract the triples of the top levels that changed, then
+            # add back those that are still in the Document
+            for key in self._dirty_top_levels:
+                _, subjects = self._graph_subjects.pop(key, (None, ()))
+                for subject in subjects:
+                    self.graph.remove((subject, None, None))
+            top_levels = set(id(obj) for obj in self.SBOLObjects.values())
+            for key, obj in self._dirty_top_levels.items():
+                if key in top_levels:
+                    self._add_to_graph(obj)
+            self._dirty_top_levels.clear()
         for prefix, ns in self._namespaces.items():
             self.graph.bind(prefix, ns)
-        # ASSUMPTION: Document does not have properties. Is this a valid assumption?
-        for obj in self.SBOLObjects.values():
-            obj.build_graph(self.graph)
+        self._graph_namespaces = dict(self._namespaces)
         if self.logger.isEnabledFor(logging.DEBUG):
             for s, p, o in self.graph:
                 self.logger.debug('Graph contains: %r', (s, p, o))
 
+    def _add_to_graph(self, obj):
+        recorder = _SubjectRecorder(self.graph)
+        obj.build_graph(recorder)
+        self._graph_subjects[id(obj)] = (obj, recorder.subjects)
+
     def validate(self):
         """
         Run validation on this Document via the validation tool (locally or online, depending on configuration)
@@ -845,6 +1560,7 @@ class Document(Identified):
 
         :return: The total number of objects in the Document.
         """
+        self._materialize_all()
         return len(self.SBOLObjects)
 
     def __len__(self):
@@ -881,6 +1597,7 @@ class Document(Identified):
     #
 
     def __iter__(self):
+        self._materialize_all()
         self.current_obj = 0
         self.owned_objects_list = []
         for obj in self.SBOLObjects.values():
@@ -922,6 +1639,7 @@ class Document(Identified):
 
         :return: A string representation of the Document.
         """
+        self._materialize_all()
         summary = ''
         col_size = 30
         total_core_objects = 0
@@ -945,18 +1663,26 @@ class Document(Identified):
 
     def find(self, uri):
         """
-        Search recursively for an SBOLObject in this Document
-        that matches the uri.
+        Search for an SBOLObject in this Document, top level or
+        child, that matches the uri.
 
         :param uri: The identity of the object to search for.
         :return: A pointer to the SBOLObject,
         or NULL if an object with this identity doesn't exist.
         """
-        for obj in self.SBOLObjects.values():
-            match = obj.find(uri)
-            if match is not None:
-                return match
-        return None
+        uri = rdflib.URIRef(uri)
+        if self._renamed:
+            self._index_renamed()
+        obj = self._identity_index.get(uri)
+        if obj is None:
+            if self._lazy_top_levels and self._materialize_uri(uri):
+                return self.find(uri)
+            return None
+        if not string_equal(obj.identity, uri):
+            # The identity of the object changed after it was indexed
+            del self._identity_index[uri]
+            return None
+        return obj
 
     def getTypeURI(self):
         return URIRef(SBOL_DOCUMENT)
@@ -964,6 +1690,8 @@ class Document(Identified):
     def getTopLevel(self, uri):
         # Ensure it's a URI Ref
         uri = rdflib.URIRef(uri)
+        if uri not in self.SBOLObjects and self._lazy_top_levels:
+            self._materialize_uri(uri)
         if uri not in self.SBOLObjects:
             msg = 'Top level object {} is not in document'
             msg = msg.format(uri)
@@ -985,6 +1713,7 @@ class Document(Identified):
         # copy method, we short-circuit its default behavior to auto-increment version.
         if version is None:
             version = self.version
+        self._materialize_all()
         return super().copy(target_doc, target_namespace, version)
 
     def exportToFormat(self, language: str, output_path: str):
@@ -1060,7 +1789,7 @@ class Document(Identified):
                 raise SBOLError(SBOLErrorCode.SBOL_ERROR_BAD_HTTP_REQUEST, msg)
 
         if response['valid']:
-            self.appendString(response['result'], overwrite)
+            self._append_rdfxml(response['result'], overwrite)
         else:
             msg = ' '.join(response['errors'])
             raise SBOLError(SBOLErrorCode.SBOL_ERROR_INVALID_ARGUMENT, msg)
@@ -1090,6 +1819,20 @@ class Document(Identified):
         self.add(obj)
 
 
+class _SubjectRecorder:
+    # Passed to build_graph in place of the graph. Adds the triples
+    # to the graph and remembers their subjects so that they can be
+    # retracted when the object changes.
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.subjects = set()
+
+    def add(self, triple):
+        self.subjects.add(triple[0])
+        self.graph.add(triple)
+
+
 def _make_validation_request(options: Mapping[str, Union[bool, str]]):
     config_options = [
         config.ConfigOptions.CHECK_BEST_PRACTICES.value,
@@ -1122,7 +1865,7 @@ def validate(doc: Document, options: Mapping[str, Any]):
     json_request = _make_validation_request(options)
     # We always want the return file
     json_request[return_file_key] = options[return_file_key]
-    json_request['main_file'] = doc.writeString()
+    json_request['main_file'] = doc._serialize_rdfxml()
 
     if not validate_online:
         result = do_validation(json_request)
@@ -1297,7 +2040,7 @@ def IGEM_STANDARD_ASSEMBLY(parts_list):
     if not (G0000_uri in doc.componentDefinitions and
             G0002_uri in doc.componentDefinitions and
             G0000_seq_uri in doc.sequences and G0002_seq_uri in doc.sequences):
-        doc.appendString(igem_assembly_scars, overwrite=True)
+        doc._append_rdfxml(igem_assembly_scars, overwrite=True)
 
     G0000 = doc.componentDefinitions[G0000_uri]
     G0002 = doc.componentDefinitions[G0002_uri]
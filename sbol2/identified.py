@@ -136,36 +136,34 @@ class Identified(SBOLObject):
             raise Exception('update_uri: Parent cannot be None')
         parent = self.parent
         if Config.getOption(ConfigOptions.SBOL_COMPLIANT_URIS.value) is True:
-            # Form compliant URI for child object
-            persistent_id = parent.properties[SBOL_PERSISTENT_IDENTITY][0]
-            persistent_id = posixpath.join(persistent_id, self.displayId)
-            if len(parent.properties[SBOL_VERSION]) > 0:
-                version = parent.properties[SBOL_VERSION][0]
-            else:
-                version = VERSION_STRING
-            obj_id = posixpath.join(persistent_id, version)
+            persistent_id, obj_id = self._compliant_uris(parent)
             # Reset SBOLCompliant properties
             self.identity = obj_id
             self.persistentIdentity = persistent_id
-            # Check for uniqueness of URI in local object properties
-            matches = parent.find_property_value(SBOL_IDENTIFIED, obj_id)
-            if len(matches) > 0:
-                raise SBOLError(SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE,
-                                "Cannot update SBOL-compliant URI. The URI " +
-                                str(self.identity) + " is not unique")
             for rdf_type, store in self.owned_objects.items():
                 if rdf_type not in self._hidden_properties:
                     for nested_obj in store:
                         nested_obj.update_uri()
         # Check for uniqueness of URI in Document
         if parent.doc:
-            matches = parent.doc.find_property_value(SBOL_IDENTITY, self.identity)
-            if len(matches) > 0:
+            match = parent.doc.find(self.identity)
+            if match is not None and match is not self:
                 raise SBOLError(SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE,
                                 "Cannot update SBOL-compliant URI. "
                                 "An object with URI " + str(self.identity) +
                                 " is already in the Document")
 
+    def _compliant_uris(self, parent):
+        # The SBOL-compliant persistentIdentity and identity of this
+        # object as a child of parent
+        persistent_id = parent.properties[SBOL_PERSISTENT_IDENTITY][0]
+        persistent_id = posixpath.join(persistent_id, self.displayId)
+        if len(parent.properties[SBOL_VERSION]) > 0:
+            version = parent.properties[SBOL_VERSION][0]
+        else:
+            version = VERSION_STRING
+        return persistent_id, posixpath.join(persistent_id, version)
+
     def copy(self, target_doc=None, target_namespace=None, version=None):
 
         new_obj = self.__class__()
@@ -283,8 +281,10 @@ class Identified(SBOLObject):
             for o in object_list:
                 o_copy = o.copy(target_doc, target_namespace, version)
                 new_obj.owned_objects[property_uri].append(o_copy)
-                o_copy.parent = self
+                o_copy.parent = new_obj
                 # o_copy.update_uri()
+                if new_obj.doc is not None:
+                    new_obj.doc._index_object(o_copy)
 
         return new_obj
 
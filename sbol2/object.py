@@ -1,12 +1,12 @@
-import logging
 import posixpath
+import types
 from typing import List
 
 from deprecated import deprecated
 import rdflib
 from rdflib import URIRef
 
-from .config import getHomespace, string_equal
+from .config import get_logger, getHomespace, string_equal
 from .config import hasHomespace
 from .config import Config
 from .constants import *
@@ -14,7 +14,6 @@ from .property import Property, OwnedObject, URIProperty
 from .sbolerror import SBOLError
 from .sbolerror import SBOLErrorCode
 from .uridict import URIDict
-from . import SBOL2Serialize
 from . import validation
 
 
@@ -48,11 +47,73 @@ def _compare_owned_objects(obj1, obj2):
     return True
 
 
+class _TransparentProperty:
+    """A data descriptor that makes a Property stored in the instance
+    dictionary look like its value. Getting the attribute returns the
+    value of the property and setting it calls the property's set
+    method. Other values stored under the same name are returned and
+    replaced as is.
+
+    SBOLObject.__setattr__ installs one on the class the first time a
+    Property is assigned to an attribute, so attributes that are not
+    properties are looked up without any overhead.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            result = instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+        if isinstance(result, OwnedObject):
+            if result.getUpperBound() == '1':
+                if result:
+                    return result[0]
+                return None
+            return result
+        if isinstance(result, Property):
+            # Any other kind of Property besides OwnedObject is
+            # converted so that it looks like a native type.
+            return result.value
+        return result
+
+    def __set__(self, instance, value):
+        attr = instance.__dict__.get(self.name)
+        if isinstance(attr, Property):
+            attr.set(value)
+        else:
+            instance.__dict__[self.name] = value
+
+    def __delete__(self, instance):
+        try:
+            del instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+
+
 class SBOLObject:
     """An SBOLObject converts a Python data structure into an RDF triple store
      and contains methods for serializing and parsing RDF triples.
     """
 
+    # The attributes every object has are kept in slots. The instance
+    # dictionary holds the Property objects.
+    __slots__ = ('__dict__', '__weakref__', 'owned_objects', 'properties',
+                 'doc', 'parent', 'rdf_type')
+
+    # Rarely used, so shared by all objects that do not set their own
+    _default_namespace = None
+    _hidden_properties = ()
+    _namespaces = types.MappingProxyType({})
+    # rdf_type -> index of an owned object store, see OwnedObject
+    _store_indexes = None
+    # displayId stem -> next suffix to try, see OwnedObject.next_free_id
+    _id_counters = None
+
     def _serialize(self):
         # Convert and SBOL object into RDF triples.
         raise NotImplementedError("Not yet implemented")
@@ -83,10 +144,7 @@ class SBOLObject:
         self.properties = URIDict()  # map<rdf_type, vector<SBOLObject>>
         self.doc = None
         self.parent = None
-        self._default_namespace = None
-        self._hidden_properties = []
         self.rdf_type = str(type_uri)
-        self._namespaces = {}
         self.identity = URIProperty(self, SBOL_IDENTITY, '0', '1',
                                     [validation.sbol_rule_10202])
         uri = URIRef(uri)
@@ -96,13 +154,7 @@ class SBOLObject:
 
     @property
     def logger(self):
-        logger = logging.getLogger('sbol2')
-        if not logger.hasHandlers():
-            # If there are no handlers, nobody has initialized
-            # logging.  Configure logging here so we have a chance of
-            # seeing the messages.
-            logging.basicConfig()
-        return logger
+        return get_logger()
 
     def __uri__(self) -> rdflib.URIRef:
         """Returns a URIRef representing this object.
@@ -315,6 +367,8 @@ class SBOLObject:
             raise TypeError('%r is not a string', val)
         # Ensure that the property is a URIRef
         property_uri = rdflib.URIRef(property_uri)
+        if self.doc is not None:
+            self.doc._object_changed(self)
         # If there is effectively no value (i.e. '') clear out the
         # value
         if not val:
@@ -414,46 +468,19 @@ class SBOLObject:
                            URIRef(owned_obj.identity)))
                 owned_obj.build_graph(graph)
 
-            # register ownership relationship in SBOL2Serialize to structure XML
-            SBOL2Serialize.register_ownership_relation(self.getTypeURI(),
-                                                       typeURI)
-
     def __str__(self):
         return self.identity
 
     def is_top_level(self):
         return False
 
-    def __getattribute__(self, name):
-        # Call the default method
-        result = object.__getattribute__(self, name)
-        if isinstance(result, OwnedObject):
-            if result.getUpperBound() == '1':
-                if result:
-                    result = result[0]
-                else:
-                    result = None
-        elif isinstance(result, Property):
-            # Else if attribute is any other kind of Property besides
-            # OwnedObject, convert so the Property attributes are
-            # transparent and look like native types.
-            result = result.value
-        return result
-
-    def _is_transparent_attribute(self, name):
-        try:
-            attr = self.__dict__[name]
-        except KeyError:
-            return False
-        return isinstance(attr, Property)
-
-    def _set_transparent_attribute(self, name, value):
-        self.__dict__[name].set(value)
-
     def __setattr__(self, name, value):
-        if self._is_transparent_attribute(name):
-            self._set_transparent_attribute(name, value)
-            return
+        if isinstance(value, Property):
+            # Properties are stored in the instance dictionary. The
+            # descriptor on the class makes them transparent.
+            cls = type(self)
+            if not isinstance(getattr(cls, name, None), _TransparentProperty):
+                setattr(cls, name, _TransparentProperty(name))
         object.__setattr__(self, name, value)
 
     def _added_to_document(self, doc):
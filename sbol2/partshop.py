@@ -1,6 +1,5 @@
 import getpass
 import http
-import logging
 import os
 import posixpath
 from typing import List, Optional, Union
@@ -12,6 +11,7 @@ import urllib3.exceptions
 
 from .config import Config, parseClassName
 from .config import ConfigOptions
+from .config import get_logger
 from .config import parseURLDomain
 from .constants import *
 from .sbolerror import SBOLError
@@ -69,13 +69,7 @@ class PartShop:
 
     @property
     def logger(self):
-        logger = logging.getLogger('sbol2')
-        if not logger.hasHandlers():
-            # If there are no handlers, nobody has initialized
-            # logging.  Configure logging here so we have a chance of
-            # seeing the messages.
-            logging.basicConfig()
-        return logger
+        return get_logger()
 
     def count(self):
         """Return the count of objects contained in a PartShop"""
@@ -157,7 +151,7 @@ class PartShop:
             elif not response:
                 raise SBOLError(SBOLErrorCode.SBOL_ERROR_BAD_HTTP_REQUEST, response)
             # Add content to document
-            doc.appendString(response.content, overwrite=True)
+            doc._append_rdfxml(response.content, overwrite=True)
             doc.resource_namespaces.add(self.resource)
 
     def submit(self, doc, collection='', overwrite=0):
@@ -209,7 +203,7 @@ class PartShop:
         files['keywords'] = (None, keywords)
         files['overwrite_merge'] = (None, str(overwrite))
         files['user'] = (None, self.key)
-        files['file'] = ('file', doc.writeString(), 'text/xml')
+        files['file'] = ('file', doc._serialize_rdfxml(), 'text/xml')
         if collection != '':
             files['rootCollections'] = (None, collection)
         # Send POST request
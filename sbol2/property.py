@@ -1,9 +1,9 @@
 import datetime
 from abc import ABC, abstractmethod
 import collections
-import logging
 import math
 import posixpath
+import types
 from typing import Any, Union
 
 import dateutil.parser
@@ -12,6 +12,7 @@ import packaging.version as pv
 
 from .config import Config
 from .config import ConfigOptions
+from .config import get_logger
 from .config import getHomespace
 from .config import parseClassName
 from .config import parsePropertyName
@@ -19,12 +20,73 @@ from .config import string_equal
 from .constants import *
 from .sbolerror import SBOLError
 from .sbolerror import SBOLErrorCode
+from .uridict import intern_uri, uri_key
 
 
 def sort_version(obj):
     return obj.version
 
 
+def _search_segments(uri):
+    # The segments of a search string that an SBOL-compliant URI
+    # formed from it shares with the identity of any object it matches:
+    # those after the first, which are delimited by '/' on both sides
+    segments = uri.split('/')
+    return ([segment for segment in segments[1:] if segment] or
+            [segment for segment in segments if segment] or [''])
+
+
+def _is_module_function(rule):
+    return (isinstance(rule, types.FunctionType)
+            and rule.__qualname__ == rule.__name__)
+
+
+class _PropertySchema:
+    """The definition of a property: its predicate, bounds and
+    validation rules. It is the same for every object that declares the
+    property the same way, so it is built once and shared by all the
+    Property instances that use it.
+    """
+
+    __slots__ = ('rdf_type', 'lower_bound', 'upper_bound', 'validation_rules')
+
+    # (type_uri, lower_bound, upper_bound, validation_rules) -> schema
+    _cache = {}
+
+    def __init__(self, type_uri, lower_bound, upper_bound, validation_rules):
+        self.rdf_type = uri_key(type_uri)
+        self.lower_bound = Property.valid_lower_bound(lower_bound)
+        self.upper_bound = Property.valid_upper_bound(upper_bound)
+        # Validate validation rules
+        if validation_rules is None:
+            # Some constructors pass None for validation rules
+            # Convert to empty list
+            validation_rules = []
+        for vr in validation_rules:
+            if not callable(vr):
+                raise TypeError('Validation rule %r is not callable' % vr)
+        self.validation_rules = list(validation_rules)
+
+    @classmethod
+    def get(cls, type_uri, lower_bound, upper_bound, validation_rules):
+        rules = tuple(validation_rules or ())
+        if not all(_is_module_function(vr) for vr in rules):
+            # Bound methods and closures would keep the objects they
+            # refer to alive in the cache, and differ for each object
+            return cls(type_uri, lower_bound, upper_bound, validation_rules)
+        try:
+            key = (type_uri, lower_bound, upper_bound, rules)
+            return cls._cache[key]
+        except TypeError:
+            # Not hashable, do not cache. The constructor reports
+            # invalid arguments.
+            return cls(type_uri, lower_bound, upper_bound, validation_rules)
+        except KeyError:
+            schema = cls(type_uri, lower_bound, upper_bound, validation_rules)
+            cls._cache[key] = schema
+            return schema
+
+
 class Property(ABC):
     """Member properties of all SBOL objects are defined
     using a Property object.
@@ -32,8 +94,14 @@ class Property(ABC):
     The Property class provides a generic interface for accessing SBOL objects.
     At a low level, the Property class converts SBOL data structures
     into RDF triples.
+
+    A Property holds only its owner and a schema shared with the other
+    instances that declare it the same way. The values are stored in
+    the owner.
     """
 
+    __slots__ = ('_sbol_owner', '_schema')
+
     @staticmethod
     def valid_lower_bound(x: Union[int, float, str]) -> str:
         """Validate the lower bound. Allow numeric strings, ints,
@@ -93,30 +161,30 @@ class Property(ABC):
         if not isinstance(property_owner.properties, collections.abc.Mapping):
             raise TypeError('property_owner.properties must be a dict')
         self._sbol_owner = property_owner
-        self._rdf_type = str(type_uri)
-        self._lowerBound = Property.valid_lower_bound(lower_bound)
-        self._upperBound = Property.valid_upper_bound(upper_bound)
-        # Validate validation rules
-        if validation_rules is None:
-            # Some constructors pass None for validation rules
-            # Convert to empty list
-            validation_rules = []
-        for vr in validation_rules:
-            if not callable(vr):
-                raise TypeError('Validation rule %r is not callable' % vr)
-        self._validation_rules = validation_rules
+        self._schema = _PropertySchema.get(type_uri, lower_bound, upper_bound,
+                                           validation_rules)
         if initial_value is not None:
             self.value = initial_value
 
+    @property
+    def _rdf_type(self):
+        return self._schema.rdf_type
+
+    @property
+    def _lowerBound(self):
+        return self._schema.lower_bound
+
+    @property
+    def _upperBound(self):
+        return self._schema.upper_bound
+
+    @property
+    def _validation_rules(self):
+        return self._schema.validation_rules
+
     @property
     def logger(self):
-        logger = logging.getLogger('sbol2')
-        if not logger.hasHandlers():
-            # If there are no handlers, nobody has initialized
-            # logging.  Configure logging here so we have a chance of
-            # seeing the messages.
-            logging.basicConfig()
-        return logger
+        return get_logger()
 
     def getTypeURI(self):
         """
@@ -169,6 +237,7 @@ class Property(ABC):
         """
         if self._sbol_owner is not None:
             if self._rdf_type in self._sbol_owner.properties:
+                self._mark_changed()
                 properties = self._sbol_owner.properties[self._rdf_type]
                 if index >= len(properties):
                     raise SBOLError(SBOLErrorCode.SBOL_ERROR_INVALID_ARGUMENT,
@@ -182,6 +251,7 @@ class Property(ABC):
 
     def clear(self):
         """Clear all property values."""
+        self._mark_changed()
         properties = self._sbol_owner.properties[self._rdf_type]
         properties.clear()
 
@@ -242,6 +312,32 @@ class Property(ABC):
     def _isHidden(self):
         return self._rdf_type in self._sbol_owner._hidden_properties
 
+    def _mark_changed(self):
+        # The values of this property are changing, so the Document
+        # indexes and graph that cover the owner are out of date
+        owner = self._sbol_owner
+        if owner is None:
+            return
+        if owner.doc is not None:
+            if self._rdf_type == SBOL_IDENTITY and owner.doc is not owner:
+                owner.doc._identity_changing(owner)
+            owner.doc._object_changed(owner)
+        if self._rdf_type in _StoreIndex.KEYS and owner.parent is not None:
+            # The owner may be looked up by this property in its
+            # parent's object stores
+            indexes = owner.parent._store_indexes
+            if indexes:
+                for rdf_type, index in list(indexes.items()):
+                    if id(owner) in index.objects:
+                        del indexes[rdf_type]
+                        owner.parent._id_counters = None
+        elif self._rdf_type in _StoreIndex.PRECEDES_KEYS and owner.parent is not None:
+            indexes = owner.parent._store_indexes
+            if indexes:
+                for index in indexes.values():
+                    if id(owner) in index.objects:
+                        index.precedes = None
+
     def __len__(self):
         if self._rdf_type not in self._sbol_owner.properties:
             return 0
@@ -295,6 +391,8 @@ class Property(ABC):
 
 class URIProperty(Property):
 
+    __slots__ = ()
+
     def __init__(self, property_owner, type_uri, lower_bound, upper_bound,
                  validation_rules, initial_value=None):
         super().__init__(property_owner, type_uri, lower_bound, upper_bound,
@@ -332,6 +430,7 @@ class URIProperty(Property):
 
     def set(self, new_value):
         self.validate(new_value)
+        self._mark_changed()
         if self.getUpperBound() == '1':
             self.setSinglePropertyValue(new_value)
         else:
@@ -381,11 +480,13 @@ class URIProperty(Property):
         if not isinstance(value, str):
             msg = '{} values must have type str'.format(self.getTypeURI())
             raise TypeError(msg)
-        return URIRef(value)
+        return intern_uri(value)
 
 
 class LiteralProperty(Property):
 
+    __slots__ = ()
+
     def __init__(self, property_owner, type_uri, lower_bound, upper_bound,
                  validation_rules=None, initial_value=None):
         validation_rules, initial_value = Property.guess_args(validation_rules,
@@ -420,6 +521,7 @@ class LiteralProperty(Property):
         self.set(new_value)
 
     def set(self, new_value):
+        self._mark_changed()
         if self.getUpperBound() == '1':
             self.setSinglePropertyValue(new_value)
         else:
@@ -454,6 +556,7 @@ class LiteralProperty(Property):
             msg = msg.format(self._rdf_type, self.upper_bound)
             raise ValueError(msg)
         new_value = self.convert_from_user(new_value)
+        self._mark_changed()
         property.append(new_value)
 
     def convert_to_user(self, value):
@@ -473,6 +576,8 @@ class LiteralProperty(Property):
 
 class IntProperty(LiteralProperty):
 
+    __slots__ = ()
+
     def convert_to_user(self, value):
         return int(value)
 
@@ -489,6 +594,8 @@ class IntProperty(LiteralProperty):
 
 class FloatProperty(LiteralProperty):
 
+    __slots__ = ()
+
     def convert_to_user(self, value: rdflib.Literal) -> float:
         return float(value)
 
@@ -508,6 +615,8 @@ class FloatProperty(LiteralProperty):
 
 class DateTimeProperty(LiteralProperty):
 
+    __slots__ = ()
+
     def convert_to_user(self, value):
         return dateutil.parser.parse(value)
 
@@ -527,6 +636,8 @@ class DateTimeProperty(LiteralProperty):
 
 class TextProperty(LiteralProperty):
 
+    __slots__ = ()
+
     # In the future, pull the convert_to_user and convert_from_user
     # methods out of LiteralProperty and into TextProperty. Then make
     # LiteralProperty an abstract base class.
@@ -539,7 +650,101 @@ class TextProperty(LiteralProperty):
         return result
 
 
+class _StoreIndex:
+    """Lookup tables for the objects in an OwnedObject store, by
+    identity, persistentIdentity and the segments of the identity, eg
+    the displayId. An index is built on demand. Objects appended to
+    the store are added to it and it is rebuilt when the store is
+    replaced or shrinks. OwnedObject drops it when it removes objects
+    and Property drops it when one of the KEYS of an object in the
+    store changes.
+
+    A store of SequenceConstraints also keeps the precedes relations
+    between Components, built on demand by ComponentDefinition and
+    dropped when one of the PRECEDES_KEYS of a constraint changes.
+
+    Replacing objects in a store directly, eg
+    ``owned_objects[rdf_type][i] = obj``, is not supported: the index,
+    the precedes relations and the ID counters of the owner go stale.
+    Replacing the whole store list is noticed and rebuilds them.
+    """
+
+    __slots__ = ('store', 'size', 'objects', 'identities',
+                 'persistent_identities', 'segments', 'newest', 'precedes')
+
+    KEYS = frozenset([SBOL_IDENTITY, SBOL_PERSISTENT_IDENTITY,
+                      SBOL_DISPLAY_ID, SBOL_VERSION])
+    PRECEDES_KEYS = frozenset([SBOL_SUBJECT, SBOL_OBJECT, SBOL_RESTRICTION])
+
+    def __init__(self, store):
+        self.store = store
+        self.size = 0
+        # The ids of the objects in the store
+        self.objects = set()
+        self.identities = {}
+        self.persistent_identities = {}
+        self.segments = {}
+        # persistentIdentity -> newest version, filled in on demand
+        self.newest = {}
+        self.precedes = None
+        self.update()
+
+    def update(self):
+        # Index the objects appended to the store since the last update
+        self.precedes = None
+        for obj in self.store[self.size:]:
+            self.objects.add(id(obj))
+            identity = str(obj.identity)
+            # The first object wins, like a search of the store would
+            self.identities.setdefault(identity, obj)
+            values = obj.properties.get(SBOL_PERSISTENT_IDENTITY)
+            if values:
+                persistent_identity = str(values[0])
+                self.persistent_identities.setdefault(persistent_identity,
+                                                      []).append(obj)
+                self.newest.pop(persistent_identity, None)
+            for segment in set(identity.split('/')):
+                self.segments.setdefault(segment, []).append(obj)
+        self.size = len(self.store)
+
+    def newest_version(self, persistent_identity):
+        try:
+            return self.newest[persistent_identity]
+        except KeyError:
+            pass
+        found_object = None
+        found_version = pv.NegativeInfinity
+        for obj in self.persistent_identities.get(persistent_identity, ()):
+            obj_version = pv.parse(obj.version)
+            if obj_version > found_version:
+                found_object = obj
+                found_version = obj_version
+        self.newest[persistent_identity] = found_object
+        return found_object
+
+
+def _owner_store_index(owner, rdf_type):
+    # The index of one of the owned object stores of owner, built or
+    # updated as needed
+    store = owner.owned_objects[rdf_type]
+    if owner._store_indexes is None:
+        owner._store_indexes = {}
+    index = owner._store_indexes.get(rdf_type)
+    if index is None or index.store is not store or index.size > len(store):
+        if index is not None:
+            # The store was replaced, which may free IDs
+            owner._id_counters = None
+        index = _StoreIndex(store)
+        owner._store_indexes[rdf_type] = index
+    elif index.size < len(store):
+        index.update()
+    return index
+
+
 class OwnedObject(Property):
+
+    __slots__ = ('builder',)
+
     def __init__(self, property_owner, sbol_uri, builder, lower_bound, upper_bound,
                  validation_rules=None, first_object=None):
         """Initialize a container and optionally put the first object in it.
@@ -594,6 +799,73 @@ class OwnedObject(Property):
         if self._sbol_owner is None:
             # Just silently do nothing?
             return
+        if self._add(sbol_obj):
+            # Run validation rules
+            self.validate(sbol_obj)
+
+    def extend(self, sbol_objs):
+        """Add several objects to this property.
+
+        This is equivalent to calling add for each object, but the
+        validation rules are run once all the objects have been added.
+        If any of the URIs is not unique, none of the objects is added.
+
+        :param sbol_objs: An iterable of SBOL objects
+        :return: None
+        """
+        if self._sbol_owner is None:
+            return
+        sbol_objs = list(sbol_objs)
+        self._check_unique(sbol_objs)
+        added = [sbol_obj for sbol_obj in sbol_objs if self._add(sbol_obj)]
+        # Run validation rules
+        for sbol_obj in added:
+            self.validate(sbol_obj)
+
+    def _check_unique(self, sbol_objs):
+        # Raise the error _add would for any of the objects before
+        # adding them, including for objects with the same URI
+        owner = self._sbol_owner
+        doc = owner.doc
+        compliant = Config.getOption(ConfigOptions.SBOL_COMPLIANT_URIS.value)
+        index = self._store_index()
+        objects = set()
+        identities = set()
+        for sbol_obj in sbol_objs:
+            if sbol_obj.is_top_level() and doc is not None:
+                identity = str(sbol_obj.identity)
+                if identity in identities or doc.find(identity) is not None:
+                    raise SBOLError(SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE,
+                                    'Cannot add ' + identity +
+                                    ' to Document. An object with this '
+                                    'identity is already contained in the '
+                                    'Document')
+                identities.add(identity)
+                if not self._isHidden():
+                    continue
+            if compliant is True:
+                identity = str(sbol_obj._compliant_uris(owner)[1])
+            else:
+                identity = str(sbol_obj.identity)
+            if (id(sbol_obj) in index.objects or id(sbol_obj) in objects or
+                    identity in index.identities or identity in identities):
+                raise SBOLError(SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE,
+                                "The object " + identity +
+                                " is already contained by the " +
+                                self._rdf_type + " property")
+            if doc is not None:
+                match = doc.find(identity)
+                if match is not None and match is not sbol_obj:
+                    raise SBOLError(SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE,
+                                    "Cannot update SBOL-compliant URI. "
+                                    "An object with URI " + identity +
+                                    " is already in the Document")
+            objects.add(id(sbol_obj))
+            identities.add(identity)
+
+    def _add(self, sbol_obj):
+        # Add an object without running the validation rules. Returns
+        # True if the object was added to this property's store.
 
         # If this is a top level object, add it and all its children recursively to the
         # Document. (With some additional refactoring, this could probably all be handled
@@ -605,11 +877,11 @@ class OwnedObject(Property):
             # accessed from both the Document top level and as a child of another top
             # level)
             if not self._isHidden():
-                return
+                return False
 
         # Not top level, add to the attribute
-        object_store = self._sbol_owner.owned_objects[self._rdf_type]
-        if sbol_obj in object_store:
+        index = self._store_index()
+        if id(sbol_obj) in index.objects:
             raise SBOLError(SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE,
                             "The object " + sbol_obj.identity +
                             " is already contained by the " +
@@ -623,16 +895,17 @@ class OwnedObject(Property):
         sbol_obj.update_uri()
         # Check that this URI is unique within the object store
         # See issue #127
-        for obj in object_store:
-            if obj.identity == sbol_obj.identity:
-                raise SBOLError(SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE,
-                                "The object " + sbol_obj.identity +
-                                " is already contained by the " +
-                                self._rdf_type + " property")
+        if sbol_obj.identity in index.identities:
+            raise SBOLError(SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE,
+                            "The object " + sbol_obj.identity +
+                            " is already contained by the " +
+                            self._rdf_type + " property")
         # Add to parent object
-        object_store.append(sbol_obj)
-        # Run validation rules
-        self.validate(sbol_obj)
+        index.store.append(sbol_obj)
+        index.update()
+        if self._sbol_owner.doc is not None:
+            self._sbol_owner.doc._index_object(sbol_obj)
+        return True
 
     def __getitem__(self, id):
         if type(id) is int:
@@ -644,6 +917,7 @@ class OwnedObject(Property):
         raise TypeError(errmsg)
 
     def get_int(self, id):
+        self._materialize()
         object_store = self._sbol_owner.owned_objects[self._rdf_type]
         if id >= len(object_store):
             # Note: for loops expect an IndexError to be
@@ -672,14 +946,25 @@ class OwnedObject(Property):
                   Config.getOption(ConfigOptions.SBOL_TYPED_URIS.value))
             print('Searching for ' + id)
         # Search this property's object store for the uri
-        object_store = self._sbol_owner.owned_objects[self._rdf_type]
-        for obj in object_store:
-            if id == obj.identity:
+        index = self._store_index()
+        obj = index.identities.get(id)
+        if obj is not None:
+            return obj
+        if self._materialize(id):
+            index = self._store_index()
+            obj = index.identities.get(id)
+            if obj is not None:
                 return obj
         # Now assume the search string is a persistent identity
         obj = self.find_persistent_identity(id)
         if obj is not None:
             return obj
+        # An SBOL-compliant URI formed from the search string can only
+        # match an object that has all its search segments as segments
+        # of its identity, so only the objects with the rarest one are
+        # searched
+        object_store = min((index.segments.get(segment, ())
+                            for segment in _search_segments(id)), key=len)
         # If searching by the full URI fails, assume the user is searching
         # for an SBOL-compliant URI using the displayId only
         # Form compliant URI for child object
@@ -708,19 +993,54 @@ class OwnedObject(Property):
             # Must be using compliant URIs to search by persistent identity
             return None
         # Search for persistent identity, returning the newest version
-        # Similar to the looping in find_resource, but we can do it better
-        # if a match, store it. If another match, check versions and keep
-        # the newer one.
-        found_object = None
-        found_version = pv.NegativeInfinity
-        object_store = self._sbol_owner.owned_objects[self._rdf_type]
-        for obj in object_store:
-            if obj.identity.startswith(search_uri):
-                obj_version = pv.parse(obj.version)
-                if obj_version > found_version:
-                    found_object = obj
-                    found_version = obj_version
-        return found_object
+        return self._store_index().newest_version(str(search_uri))
+
+    def _store_index(self):
+        return _owner_store_index(self._sbol_owner, self._rdf_type)
+
+    def next_free_id(self, stem):
+        """Get a displayId for a new object in this property, of the form
+        <stem>_<n> with the lowest n not used by an object of the owner.
+
+        The owner remembers the next suffix to try for each stem until
+        one of its objects is removed or renamed, so choosing the IDs of
+        many new objects takes linear time.
+
+        :param stem: The displayId without the suffix
+        :return: The displayId
+        """
+        owner = self._sbol_owner
+        if owner._id_counters is None:
+            owner._id_counters = {}
+        indexes = [_owner_store_index(owner, rdf_type)
+                   for rdf_type in owner.owned_objects
+                   if rdf_type not in owner._hidden_properties]
+        suffix = owner._id_counters.get(stem, 0)
+        display_id = '%s_%d' % (stem, suffix)
+        # The stem may be a full URI if SBOL-compliant URIs are off
+        while any(display_id in index.segments or display_id in index.identities
+                  for index in indexes):
+            suffix += 1
+            display_id = '%s_%d' % (stem, suffix)
+        # The ID is not used until the object is created, so it is
+        # tried first next time
+        owner._id_counters[stem] = suffix
+        return display_id
+
+    def _materialize(self, uri=None):
+        # Top levels read lazily into a Document are built when their
+        # property is used. Returns True if any were built.
+        doc = self._sbol_owner
+        if doc.rdf_type != SBOL_DOCUMENT or not doc._lazy_top_levels:
+            return False
+        doc._materialize_type(self._rdf_type, uri)
+        return True
+
+    def _invalidate_store_index(self):
+        if self._sbol_owner._store_indexes:
+            self._sbol_owner._store_indexes.pop(self._rdf_type, None)
+        # Removing objects frees their IDs
+        self._sbol_owner._id_counters = None
 
     def find_resource(self, uri, resource_namespaces, object_store,
                       parent_obj, typedURI=False):
@@ -743,9 +1063,9 @@ class OwnedObject(Property):
             for obj in object_store:
                 if compliant_uri in obj.identity:
                     persistent_id_matches.append(obj)
-                # Sort objects with same persistentIdentity by version
-                # TODO is this right?
-                persistent_id_matches.sort(key=sort_version)
+            # Sort objects with same persistentIdentity by version
+            # TODO is this right?
+            persistent_id_matches.sort(key=sort_version)
             # If objects matching the persistentIdentity were found,
             # return the most recent version
             if len(persistent_id_matches) > 0:
@@ -769,6 +1089,7 @@ class OwnedObject(Property):
     def get(self, uri=''):
         # TODO: orig getter contains a size check when uri is a constant string
         if uri == '':
+            self._materialize()
             object_store = self._sbol_owner.owned_objects[self._rdf_type]
             if object_store:
                 return object_store[0]
@@ -801,6 +1122,8 @@ class OwnedObject(Property):
         # Update URI for the argument object and all its children,
         # if SBOL-compliance is enabled.
         sbol_obj.update_uri()
+        if self._sbol_owner.doc is not None:
+            self._sbol_owner.doc._index_object(sbol_obj)
 
         # Run validation rules
         self.validate(sbol_obj)
@@ -856,6 +1179,8 @@ class OwnedObject(Property):
             if value is not None:
                 self.remove(value.identity)
             return
+        self._unindex_objects()
+        self._invalidate_store_index()
         self._sbol_owner.owned_objects[self._rdf_type].clear()
         self.add(new_value)
 
@@ -864,6 +1189,8 @@ class OwnedObject(Property):
         #
         # TODO: This can leave the attribute empty if `add` fails.
         # Can we capture that and sent the old value back again?
+        self._unindex_objects()
+        self._invalidate_store_index()
         self._sbol_owner.owned_objects[self._rdf_type].clear()
         for nv in new_value:
             self.add(nv)
@@ -881,6 +1208,7 @@ class OwnedObject(Property):
             raise TypeError(msg)
 
     def removeOwnedObject_int(self, index):
+        self._materialize()
         if self._sbol_owner is not None:
             if self._rdf_type in self._sbol_owner.owned_objects:
                 object_store = self._sbol_owner.owned_objects[self._rdf_type]
@@ -890,7 +1218,10 @@ class OwnedObject(Property):
                 obj = object_store[index]
                 if self._sbol_owner.getTypeURI() == SBOL_DOCUMENT:
                     del obj.doc.SBOLObjects[rdflib.URIRef(obj.identity)]
+                if obj.doc is not None and not self._isHidden():
+                    obj.doc._unindex_object(obj)
                 del object_store[index]
+                self._invalidate_store_index()
                 obj.doc = None
                 self.validate(None)
                 return obj
@@ -904,23 +1235,43 @@ class OwnedObject(Property):
         obj = self.find(uri)
         object_store = self._sbol_owner.owned_objects[self._rdf_type]
         object_store.remove(obj)
+        self._invalidate_store_index()
         # Erase TopLevel objects from Document
         if self._sbol_owner.rdf_type == SBOL_DOCUMENT:
             del obj.doc.SBOLObjects[obj.identity]
+        if obj.doc is not None and not self._isHidden():
+            obj.doc._unindex_object(obj)
         obj.doc = None
         self.validate(None)
         return obj
 
     def clear(self):
+        self._materialize()
         if self._sbol_owner is not None:
             if self._rdf_type in self._sbol_owner.owned_objects:
                 object_store = self._sbol_owner.owned_objects[self._rdf_type]
                 for obj in object_store:
                     if obj.is_top_level() and obj.doc is not None:
                         obj.doc.SBOLObjects.remove(obj.identity)
+                self._unindex_objects()
+                self._invalidate_store_index()
                 object_store.clear()
 
+    def _unindex_objects(self):
+        # Drop the objects in this property from the Document's
+        # identity index before they are removed from the property.
+        # Objects in a hidden property stay in the Document as top
+        # levels.
+        if self._isHidden():
+            return
+        if self._rdf_type not in self._sbol_owner.owned_objects:
+            return
+        for obj in self._sbol_owner.owned_objects[self._rdf_type]:
+            if obj.doc is not None:
+                obj.doc._unindex_object(obj)
+
     def __len__(self):
+        self._materialize()
         if self._rdf_type not in self._sbol_owner.owned_objects:
             return 0
         else:
@@ -929,6 +1280,9 @@ class OwnedObject(Property):
 
 
 class ReferencedObject(URIProperty):
+
+    __slots__ = ('reference_type_uri',)
+
     def __init__(self, property_owner, type_uri, reference_type_uri,
                  lower_bound, upper_bound, validation_rules,
                  initial_value=None):
@@ -953,6 +1307,7 @@ class ReferencedObject(URIProperty):
             # TODO: convert this to a better Python exception or to an
             # SBOL exception
             raise Exception('No owner for referenced value')
+        self._mark_changed()
         if self.getUpperBound() == '1':
             self.setSinglePropertyValue(new_value)
         else:
@@ -964,7 +1319,7 @@ class ReferencedObject(URIProperty):
 
         """
         if isinstance(obj, str):
-            return rdflib.URIRef(obj)
+            return intern_uri(obj)
         if hasattr(obj, '__uri__'):
             # SBOLObjects have a __uri__ method, and others can too
             return obj.__uri__()
@@ -1,3 +1,5 @@
+from typing import NamedTuple
+
 from deprecated import deprecated
 from rdflib import URIRef
 
@@ -9,6 +11,18 @@ from .sbolerror import SBOLError, SBOLErrorCode
 from .location import Range
 
 
+class _CompiledSequence(NamedTuple):
+    """The result of compiling a Sequence, kept in the compile cache of
+    its Document."""
+    elements: str
+    # (Range, start, end) for each Range set by the compile, relative
+    # to the offset it was compiled at
+    ranges: tuple
+    # (top level, change count) for each ComponentDefinition and
+    # Sequence the elements were compiled from
+    dependencies: tuple
+
+
 class Sequence(TopLevel):
     """
     The primary structure (eg, nucleotide or amino acid sequence)
@@ -97,14 +111,37 @@ class Sequence(TopLevel):
         raise NotImplementedError("Not yet implemented")
 
     def compile(self, composite_sequence='', assembly_method=None):
+        """Assemble the elements of this Sequence from the Sequences of
+        the subcomponents of its ComponentDefinition, recursively.
+
+        :param composite_sequence: The sequence assembled so far. Only
+        its length is used, as the offset of the Ranges created or
+        updated in this Sequence's ComponentDefinition.
+        :param assembly_method: A function of each subsequence
+        returning the string to use in its place
+        :return: The elements of this Sequence
+        """
+        return self._compile(len(composite_sequence), assembly_method).elements
+
+    def _compile(self, offset, assembly_method=None):
+        # The subsequences are gathered in a list and joined once, and
+        # the Ranges are computed from offsets, so the time taken is
+        # linear in the length of the sequence at each level.
+        #
+        # The result for each ComponentDefinition is cached in the
+        # Document with the change counts of the ComponentDefinitions
+        # and Sequences it was compiled from. While none of them has
+        # changed, compiling it again only moves its Ranges to the new
+        # offset, so a definition shared by many parents is assembled
+        # once.
         if not self.doc:
             raise ValueError('Cannot compile Sequence <%s>. The Sequence must belong to '
                              'a Document in order to compile.' % self.identity)
 
         # Search for the parent ComponentDefinition to which this Sequence belongs
         parent_cdef = None
-        for cd in self.doc.componentDefinitions:
-            if cd.sequence and cd.sequence.identity == self.identity:
+        for cd in self.doc.definitions_using_sequence(self.identity):
+            if cd.sequence is self:
                 parent_cdef = cd
                 break
 
@@ -113,15 +150,45 @@ class Sequence(TopLevel):
                              'associated with a ComponentDefinition in order to compile.'
                              % self.identity)
 
+        change_counts = self.doc._change_counts
         if len(parent_cdef.components) == 0:
-            if parent_cdef.sequence.elements:
-                return parent_cdef.sequence.elements
-            else:
-                return ''  # Maybe this should raise an Exception ?
+            # Maybe an empty sequence should raise an Exception ?
+            return _CompiledSequence(parent_cdef.sequence.elements or '', (),
+                                     tuple((obj, change_counts.get(id(obj), 0))
+                                           for obj in (parent_cdef, self)))
 
         elif len(parent_cdef.components) > 0:
+            cache = self.doc._compile_cache
+            if assembly_method is None:
+                cached = cache.get(parent_cdef.identity)
+                if cached is not None and all(
+                        change_counts.get(id(obj), 0) == count
+                        for obj, count in cached.dependencies):
+                    for r, start, end in cached.ranges:
+                        if r.start != start + offset:
+                            r.start = start + offset
+                        if r.end != end + offset:
+                            r.end = end + offset
+                    # Moving the Ranges is part of compiling
+                    cached = cached._replace(dependencies=tuple(
+                        (obj, change_counts.get(id(obj), 0))
+                        for obj, _ in cached.dependencies))
+                    cache[parent_cdef.identity] = cached
+                    return cached
+
             # Recurse into subcomponents and assemble their sequence
-            composite_sequence_initial_size = len(composite_sequence)
+            subsequences = []
+            length = offset
+            # Keyed by id so that a Range compiled more than once keeps
+            # the position it is given last
+            compiled_ranges = {}
+            dependencies = {id(parent_cdef): parent_cdef, id(self): self}
+
+            # The SequenceAnnotations of each Component
+            component_annotations = {}
+            for sa in parent_cdef.sequenceAnnotations:
+                for component in sa.properties.get(SBOL_COMPONENT_PROPERTY, ()):
+                    component_annotations.setdefault(str(component), []).append(sa)
 
             subcomponents = parent_cdef.getPrimaryStructureComponents()
             for c in subcomponents:
@@ -139,8 +206,7 @@ class Sequence(TopLevel):
 
                 # Check for regularity -- only one SequenceAnnotation per Component is
                 # allowed
-                sequence_annotations = \
-                    parent_cdef.find_property_value(SBOL_COMPONENT_PROPERTY, c.identity)
+                sequence_annotations = component_annotations.get(str(c.identity), [])
 
                 if len(sequence_annotations) > 1:
                     raise SBOLError(SBOLErrorCode.SBOL_ERROR_INVALID_ARGUMENT,
@@ -151,20 +217,13 @@ class Sequence(TopLevel):
                 # Auto-construct a SequenceAnnotation for this Component if one doesn't
                 # already exist
                 if len(sequence_annotations) == 0:
-                    sa_instance = 0
                     if Config.getOption(ConfigOptions.SBOL_COMPLIANT_URIS):
                         sa_id = cdef.displayId
                     else:
                         sa_id = cdef.identity
                     sa_id += '_annotation'
-                    sa_uri = '%s/%s_%d/%s' % (parent_cdef.persistentIdentity, sa_id,
-                                              sa_instance, cdef.version)
-                    while sa_uri in parent_cdef.sequenceAnnotations:
-                        sa_instance += 1
-                        sa_uri = '%s/%s_%d/%s' % (parent_cdef.persistentIdentity, sa_id,
-                                                  sa_instance, cdef.version)
-                    sa = parent_cdef.sequenceAnnotations.create('%s_%d' % (sa_id,
-                                                                sa_instance))
+                    annotations = parent_cdef.sequenceAnnotations
+                    sa = annotations.create(annotations.next_free_id(sa_id))
                     sa.component = c
                     sequence_annotations.append(sa)
 
@@ -177,7 +236,7 @@ class Sequence(TopLevel):
                 for loc in sa.locations:
                     if type(loc) is Range:
                         ranges.append(loc)
-                else:
+                if not ranges:
                     # Auto-construct a Range
                     if Config.getOption(ConfigOptions.SBOL_COMPLIANT_URIS):
                         range_id = sa.displayId
@@ -192,8 +251,15 @@ class Sequence(TopLevel):
                                     % (self.identity, sa.identity))
 
                 r = ranges[0]
-                r.start = len(composite_sequence) + 1
-                subsequence = seq.compile(composite_sequence)  # Recursive call
+                r.start = length + 1
+                compiled = seq._compile(length)  # Recursive call
+                for child_range, start, end in compiled.ranges:
+                    compiled_ranges[id(child_range)] = (child_range,
+                                                        start + length - offset,
+                                                        end + length - offset)
+                for obj, _ in compiled.dependencies:
+                    dependencies[id(obj)] = obj
+                subsequence = compiled.elements
                 if assembly_method:
                     subsequence = assembly_method(subsequence)
                     if not type(subsequence) is str:
@@ -205,12 +271,18 @@ class Sequence(TopLevel):
                 if len(c.sourceLocations) == 1:
                     source_loc = c.sourceLocations.getRange()
                     subsequence = subsequence[(source_loc.start - 1):source_loc.end]
-                composite_sequence = composite_sequence + subsequence
-                r.end = len(composite_sequence)
+                subsequences.append(subsequence)
+                compiled_ranges[id(r)] = (r, r.start - offset,
+                                          length + len(subsequence) - offset)
+                length += len(subsequence)
+                r.end = length
 
-            composite_sequence_current_size = composite_sequence_initial_size \
-                + len(composite_sequence)
-            subsequence = composite_sequence[composite_sequence_initial_size:
-                                             composite_sequence_current_size]
+            subsequence = ''.join(subsequences)
             self.elements = subsequence
-            return subsequence
+            compiled = _CompiledSequence(
+                subsequence, tuple(compiled_ranges.values()),
+                tuple((obj, change_counts.get(id(obj), 0))
+                      for obj in dependencies.values()))
+            if assembly_method is None:
+                cache[parent_cdef.identity] = compiled
+            return compiled
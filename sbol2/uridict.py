@@ -1,20 +1,106 @@
-import collections
+import collections.abc
+import sys
 from typing import Any
 
+from rdflib import URIRef
 
-class URIDict(collections.UserDict):
+# The maximum number of URIs kept by intern_uri. The pool is emptied
+# when it is full so that it only holds URIs in current use.
+URI_POOL_SIZE = 100000
 
-    def __init__(self):
+# str -> URIRef
+_uri_pool = {}
+
+
+def uri_key(uri: str) -> str:
+    """Return the key that URIDict uses for a URI: an interned str.
+
+    Predicates are used as keys in the properties of every object, so
+    interning them lets all the objects share a single copy of each
+    key and makes lookups compare by identity.
+    """
+    return sys.intern(str(uri))
+
+
+def intern_uri(uri: str) -> URIRef:
+    """Return a shared rdflib.URIRef for a URI.
+
+    Values such as roles, types and predicates are repeated many times
+    in a document. Interning them means that equal URIs are usually
+    the same object, which saves memory and makes comparisons fast.
+    """
+    if type(uri) is not str:
+        uri = str(uri)
+    try:
+        return _uri_pool[uri]
+    except KeyError:
+        pass
+    if len(_uri_pool) >= URI_POOL_SIZE:
+        _uri_pool.clear()
+    result = _uri_pool[uri] = URIRef(uri)
+    return result
+
+
+class URIDict(dict):
+    """A dict keyed by str. Keys of other types, such as rdflib.URIRef,
+    are converted to str so that they match regardless of their type.
+
+    Lookups with str keys go straight to dict. Only keys of other types
+    take the slower path through str conversion.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs) -> None:
         super().__init__()
+        self.update(*args, **kwargs)
 
-    def __getitem__(self, key: str) -> Any:
-        return super().__getitem__(str(key))
+    def __missing__(self, key: Any) -> Any:
+        # dict.__getitem__ did not find the key. A URIRef does not
+        # compare equal to the str it was stored as, so try again.
+        if type(key) is not str:
+            key = str(key)
+            if dict.__contains__(self, key):
+                return dict.__getitem__(self, key)
+        raise KeyError(key)
 
     def __setitem__(self, key: str, value: Any) -> None:
-        super().__setitem__(str(key), value)
+        if type(key) is not str:
+            key = str(key)
+        dict.__setitem__(self, key, value)
 
     def __delitem__(self, key: str) -> None:
-        super().__delitem__(str(key))
+        if type(key) is not str:
+            key = str(key)
+        dict.__delitem__(self, key)
 
     def __contains__(self, key: str) -> bool:
-        return super().__contains__(str(key))
+        if type(key) is not str:
+            key = str(key)
+        return dict.__contains__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if type(key) is not str:
+            key = str(key)
+        return dict.get(self, key, default)
+
+    def pop(self, key: str, *args) -> Any:
+        if type(key) is not str:
+            key = str(key)
+        return dict.pop(self, key, *args)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if type(key) is not str:
+            key = str(key)
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def copy(self) -> 'URIDict':
+        return URIDict(self)
+
+    def keys(self) -> collections.abc.KeysView:
+        # A view whose membership test converts keys like the URIDict
+        return collections.abc.KeysView(self)
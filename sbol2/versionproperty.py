@@ -5,6 +5,8 @@ import rdflib
 
 class VersionProperty(LiteralProperty):
 
+    __slots__ = ()
+
     def convert_to_user(self, value):
         result = str(value)
         if result == '':
@@ -286,6 +286,63 @@ class TestAssemblyRoutines(unittest.TestCase):
         self.assertEqual(cd_root.getPrimaryStructureComponents(), [c0, c1, c2])
         self.assertEqual(cd_root.getPrimaryStructure(), [cd0, cd1, cd2])
 
+    def test_primary_structure_changes(self):
+        # The order follows changes to the SequenceConstraints
+        cd_root = sbol2.ComponentDefinition('root')
+        c0 = cd_root.components.create('c0')
+        c1 = cd_root.components.create('c1')
+        c2 = cd_root.components.create('c2')
+        sc0 = cd_root.sequenceConstraints.create('sc0')
+        sc0.subject = c0
+        sc0.object = c1
+        self.assertEqual(cd_root.getUpstreamComponent(c1), c0)
+        sc1 = cd_root.sequenceConstraints.create('sc1')
+        sc1.subject = c1
+        sc1.object = c2
+        self.assertEqual(cd_root.getPrimaryStructureComponents(), [c0, c1, c2])
+        sc0.subject = c2
+        sc0.object = c0
+        self.assertEqual(cd_root.getPrimaryStructureComponents(), [c1, c2, c0])
+        cd_root.sequenceConstraints.remove(sc0.identity)
+        self.assertFalse(cd_root.hasUpstreamComponent(c0))
+        # A cycle that the first Component is not part of is left out
+        # like other Components that are not connected to it
+        sc2 = cd_root.sequenceConstraints.create('sc2')
+        sc2.subject = c2
+        sc2.object = c1
+        self.assertEqual(cd_root.getPrimaryStructureComponents(), [c0])
+        # Cycles
+        sc1.subject = c0
+        sc1.object = c1
+        sc2.subject = c1
+        sc2.object = c0
+        with self.assertRaises(ValueError):
+            cd_root.getFirstComponent()
+        # A branch
+        sc2.subject = c0
+        sc2.object = c2
+        with self.assertRaises(ValueError):
+            cd_root.getPrimaryStructureComponents()
+        # Identical constraints are not a branch
+        sc2.object = c1
+        self.assertEqual(cd_root.getPrimaryStructureComponents(), [c0, c1])
+
+    def test_primary_structure_unconstrained(self):
+        # Components with only other constraints are not part of the
+        # primary structure
+        cd_root = sbol2.ComponentDefinition('root')
+        c0 = cd_root.components.create('c0')
+        c1 = cd_root.components.create('c1')
+        c2 = cd_root.components.create('c2')
+        sc0 = cd_root.sequenceConstraints.create('sc0')
+        sc0.subject = c0
+        sc0.object = c1
+        sc1 = cd_root.sequenceConstraints.create('sc1')
+        sc1.subject = c2
+        sc1.object = c0
+        sc1.restriction = sbol2.SBOL_RESTRICTION_OPPOSITE_ORIENTATION_AS
+        self.assertEqual(cd_root.getPrimaryStructureComponents(), [c0, c1])
+
     def test_assemble(self):
         doc = sbol2.Document()
         gene = sbol2.ComponentDefinition("BB0001")
@@ -409,6 +466,60 @@ class TestAssemblyRoutines(unittest.TestCase):
         self.assertEqual(r4.start, 1)
         self.assertEqual(r4.end, 2)
 
+    def test_compile_offset(self):
+        # Ranges are offset by the length of the sequence compiled so far
+        doc = sbol2.Document()
+        cd1 = sbol2.ComponentDefinition('cd1')
+        cd2 = sbol2.ComponentDefinition('cd2')
+        cd3 = sbol2.ComponentDefinition('cd3')
+        cd1.sequence = sbol2.Sequence('cd1', 'tt')
+        cd2.sequence = sbol2.Sequence('cd2', 'ggg')
+        cd3.sequence = sbol2.Sequence('cd3')
+        doc.addComponentDefinition([cd1, cd2, cd3])
+        cd3.assemblePrimaryStructure([cd1, cd2])
+        self.assertEqual('ttggg', cd3.sequence.compile('nnnn'))
+        self.assertEqual('ttggg', cd3.sequence.elements)
+        r2 = cd3.sequenceAnnotations['cd2_annotation_0'].\
+            locations['cd2_annotation_0_range']
+        self.assertEqual(7, r2.start)
+        self.assertEqual(9, r2.end)
+
+    def test_compile_cache(self):
+        doc = sbol2.Document()
+        cd1 = sbol2.ComponentDefinition('cd1')
+        cd2 = sbol2.ComponentDefinition('cd2')
+        cd3 = sbol2.ComponentDefinition('cd3')
+        cd4 = sbol2.ComponentDefinition('cd4')
+        cd1.sequence = sbol2.Sequence('cd1', 'tt')
+        cd2.sequence = sbol2.Sequence('cd2', 'ggg')
+        cd3.sequence = sbol2.Sequence('cd3')
+        cd4.sequence = sbol2.Sequence('cd4')
+        doc.addComponentDefinition([cd1, cd2, cd3, cd4])
+        cd3.assemblePrimaryStructure([cd1, cd2])
+        cd4.assemblePrimaryStructure([cd2, cd3])
+        self.assertEqual('ttggg', cd3.compile())
+        cached = doc._compile_cache[cd3.identity]
+        # Compiling cd3 again inside cd4 reuses the cached result and
+        # moves its Ranges to the new offset
+        self.assertEqual('gggttggg', cd4.compile())
+        self.assertIs(cached.elements, doc._compile_cache[cd3.identity].elements)
+        r2 = cd3.sequenceAnnotations['cd2_annotation_0'].\
+            locations['cd2_annotation_0_range']
+        self.assertEqual(6, r2.start)
+        self.assertEqual(8, r2.end)
+        # A change to a subcomponent's Sequence invalidates the cache
+        cd1.sequence.elements = 'aaaa'
+        self.assertEqual('gggaaaaggg', cd4.compile())
+        self.assertEqual('aaaaggg', cd3.sequence.elements)
+        self.assertEqual(8, r2.start)
+        self.assertEqual(10, r2.end)
+        # So does a change to the SequenceConstraints
+        constraint = cd3.sequenceConstraints[0]
+        constraint.subject, constraint.object = constraint.object, constraint.subject
+        self.assertEqual('gggaaaa', cd3.compile())
+        self.assertEqual(1, r2.start)
+        self.assertEqual(3, r2.end)
+
     def test_standard_assembly(self):
         doc = sbol2.Document()
         gene = sbol2.ComponentDefinition("BB0001")
@@ -439,6 +550,24 @@ class TestAssemblyRoutines(unittest.TestCase):
 
         self.assertEqual(target_seq, 'atactagagttactagctactagagg')
 
+    def test_standard_assembly_file_format(self):
+        # The scars are read as RDF/XML whatever the file format
+        file_format = sbol2.Config.getFileFormat()
+        sbol2.Config.setFileFormat('ntriples')
+        try:
+            doc = sbol2.Document()
+            gene = sbol2.ComponentDefinition('BB0001')
+            promoter = sbol2.ComponentDefinition('R0010')
+            CDS = sbol2.ComponentDefinition('E0040')
+            promoter.sequence = sbol2.Sequence('R0010', 'a')
+            CDS.sequence = sbol2.Sequence('E0040', 'c')
+            doc.addComponentDefinition(gene)
+            gene.assemblePrimaryStructure([promoter, CDS],
+                                          sbol2.IGEM_STANDARD_ASSEMBLY)
+            self.assertEqual('atactagagc', gene.compile())
+        finally:
+            sbol2.Config.setFileFormat(file_format)
+
     def test_assemble_with_displayIds(self):
         sbol2.Config.setOption(sbol2.ConfigOptions.SBOL_TYPED_URIS, True)
 
@@ -1,3 +1,4 @@
+import logging
 import unittest
 import warnings
 
@@ -79,6 +80,15 @@ class TestConfig(unittest.TestCase):
             sbol2.Config.setOption('ca-path', '/fake/path')
         self.assertEqual(len(warns), 2)
 
+    def test_get_logger(self):
+        logger = sbol2.config.get_logger()
+        self.assertIs(logging.getLogger('sbol2'), logger)
+        self.assertIs(logger, sbol2.config.get_logger())
+        self.assertIs(logger, sbol2.ComponentDefinition('cd').logger)
+        self.assertIs(logger, sbol2.TextProperty(sbol2.SBOLObject(),
+                                                 'http://example.org/p',
+                                                 '0', '1').logger)
+
 
 if __name__ == '__main__':
     unittest.main()
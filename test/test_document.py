@@ -6,6 +6,7 @@ import unittest
 import unittest.mock
 
 import rdflib
+import rdflib.compare
 
 import sbol2
 import sbol2 as sbol
@@ -161,6 +162,173 @@ class TestDocument(unittest.TestCase):
         self.assertNotEqual(found, -1)
         self.assertIsNotNone(found)
 
+    def test_find_child(self):
+        # Child objects are found through the identity index, and
+        # removed objects are no longer found
+        doc = sbol.Document()
+        cd = doc.componentDefinitions.create('cd')
+        sa = cd.sequenceAnnotations.create('sa')
+        r = sa.locations.createRange('r')
+        self.assertIs(doc.find(sa.identity), sa)
+        self.assertIs(doc.find(r.identity), r)
+        cd.sequenceAnnotations.remove(sa.identity)
+        self.assertIsNone(doc.find(sa.identity))
+        self.assertIsNone(doc.find(r.identity))
+        doc.componentDefinitions.remove(cd.identity)
+        self.assertIsNone(doc.find(cd.identity))
+        # Parsed objects are indexed too
+        doc = sbol.Document(TEST_LOCATION)
+        for obj in doc.SBOLObjects.values():
+            for _, store in obj.owned_objects.items():
+                for child in store:
+                    self.assertIs(doc.find(child.identity), child)
+
+    def test_find_renamed(self):
+        # The identity index follows changes to identities
+        doc = sbol.Document()
+        cd = doc.componentDefinitions.create('cd')
+        sa = cd.sequenceAnnotations.create('sa')
+        old_identity = cd.identity
+        cd.identity = 'http://examples.org/foo'
+        self.assertIs(doc.find('http://examples.org/foo'), cd)
+        self.assertIsNone(doc.find(old_identity))
+        sa.identity = 'http://examples.org/bar'
+        sa.identity = 'http://examples.org/baz'
+        self.assertIs(doc.find('http://examples.org/baz'), sa)
+        self.assertIsNone(doc.find('http://examples.org/bar'))
+        cd.sequenceAnnotations.remove(sa.identity)
+        self.assertIsNone(doc.find('http://examples.org/baz'))
+
+    def test_write_string_triples(self):
+        # writeString serializes the objects directly. The result
+        # should hold the same triples as the graph built by update_graph.
+        doc = sbol.Document(TEST_LOCATION)
+        result = rdflib.Graph()
+        result.parse(data=doc.writeString(), format='xml')
+        doc.update_graph()
+        self.assertTrue(rdflib.compare.isomorphic(doc.graph, result))
+
+    def test_write_streaming(self):
+        # write streams the top levels to the file. The file should
+        # hold the same triples as writeString.
+        doc = sbol.Document(TEST_LOCATION)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            test_path = os.path.join(tmpdirname, 'test.xml')
+            doc.doc_serialize_rdf2xml(test_path)
+            written = rdflib.Graph()
+            written.parse(test_path, format='xml')
+            doc2 = sbol.Document(test_path)
+            with open(test_path, encoding='utf-8') as test_file:
+                self.assertEqual(doc.writeString(), test_file.read())
+        expected = rdflib.Graph()
+        expected.parse(data=doc.writeString(), format='xml')
+        self.assertTrue(rdflib.compare.isomorphic(expected, written))
+        self.assertTrue(doc.compare(doc2))
+        # Namespaces found while building the elements are declared
+        # on the rdf:RDF element, as writeString does
+        doc.componentDefinitions[0].annotation = sbol.TextProperty(
+            doc.componentDefinitions[0], 'http://examples.org/ext#annotation',
+            '0', '1', None, 'value')
+        empty = sbol.Document()
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            for source in (doc, empty):
+                test_path = os.path.join(tmpdirname, 'test.xml')
+                source.doc_serialize_rdf2xml(test_path)
+                with open(test_path, encoding='utf-8') as test_file:
+                    self.assertEqual(source.writeString(), test_file.read())
+
+    def test_referrers(self):
+        doc = sbol.Document()
+        seq = doc.sequences.create('seq')
+        cd1 = doc.componentDefinitions.create('cd1')
+        cd2 = doc.componentDefinitions.create('cd2')
+        self.assertEqual([], doc.referrers(seq.identity))
+        cd1.sequences = [seq.identity]
+        self.assertEqual([cd1], doc.referrers(seq.identity))
+        c = cd2.components.create('c')
+        c.definition = cd1.identity
+        self.assertEqual([c], doc.referrers(cd1.identity))
+        # The index follows changes to the Document
+        cd1.sequences = []
+        self.assertEqual([], doc.referrers(seq.identity))
+        cd2.components.remove(c.identity)
+        self.assertEqual([], doc.referrers(cd1.identity))
+        self.assertEqual([], doc.find_reference(cd1.identity))
+        # Objects added with their children and renamed objects
+        cd3 = sbol.ComponentDefinition('cd3')
+        c3 = cd3.components.create('c3')
+        c3.definition = cd1.identity
+        doc.add(cd3)
+        self.assertEqual([c3], doc.referrers(cd1.identity))
+        c3.identity = 'http://examples.org/c3'
+        self.assertEqual([c3], doc.referrers(cd1.identity))
+        doc.componentDefinitions.remove(cd3.identity)
+        self.assertEqual([], doc.referrers(cd1.identity))
+
+    def test_referrers_copy(self):
+        # The children of copied objects are referrers too
+        doc = sbol.Document(CRISPR_LOCATION)
+        doc2 = sbol.Document()
+        for top_level in list(doc.SBOLObjects.values()):
+            top_level.copy(doc2)
+        uri = 'http://sbols.org/CRISPR_Example/cas9_gRNA_complex'
+        referrers = doc.referrers(uri)
+        self.assertEqual(2, len(referrers))
+        self.assertEqual(sorted(obj.identity for obj in referrers),
+                         sorted(obj.identity for obj in doc2.referrers(uri)))
+
+    def test_add_many(self):
+        doc = sbol.Document()
+        cds = [sbol.ComponentDefinition('cd{}'.format(i)) for i in range(3)]
+        doc.add_many(cds)
+        self.assertEqual(cds, list(doc.componentDefinitions))
+        for cd in cds:
+            self.assertIs(doc, cd.doc)
+            self.assertIs(cd, doc.find(cd.identity))
+        # A duplicate leaves the Document unchanged
+        new_cd = sbol.ComponentDefinition('cd3')
+        with self.assertRaises(sbol.SBOLError) as cm:
+            doc.add_many([new_cd, sbol.ComponentDefinition('cd0')])
+        self.assertEqual(cm.exception.error_code(),
+                         sbol.SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE)
+        self.assertIsNone(doc.find(new_cd.identity))
+        with self.assertRaises(sbol.SBOLError):
+            doc.add_many([new_cd, sbol.ComponentDefinition('cd3')])
+        self.assertEqual(3, len(doc.componentDefinitions))
+
+    def test_update_graph_incremental(self):
+        def full_graph(doc):
+            graph = rdflib.Graph()
+            for obj in doc.SBOLObjects.values():
+                obj.build_graph(graph)
+            return graph
+
+        doc = sbol.Document(CRISPR_LOCATION)
+        doc.update_graph()
+        graph = doc.graph
+        md = doc.moduleDefinitions['CRISPR_Template']
+        md.name = 'CRISPR template'
+        md.functionalComponents.remove(md.functionalComponents[0].identity)
+        cd = doc.componentDefinitions.create('new_cd')
+        cd.roles = [sbol.SO_PROMOTER]
+        doc.sequences.remove(doc.sequences[0].identity)
+        doc.update_graph()
+        # The graph is updated in place
+        self.assertIs(graph, doc.graph)
+        self.assertTrue(rdflib.compare.isomorphic(full_graph(doc), doc.graph))
+        # A new read rebuilds the graph
+        doc.read(CRISPR_LOCATION)
+        doc.update_graph()
+        self.assertTrue(rdflib.compare.isomorphic(full_graph(doc), doc.graph))
+        # An edit to the child of a copy updates the copy
+        cd = doc.componentDefinitions['EYFP_gene']
+        cd_copy = cd.copy(version='2')
+        doc.update_graph()
+        self.assertIs(cd_copy, cd_copy.components[0].parent)
+        cd_copy.components[0].name = 'copied component'
+        doc.update_graph()
+        self.assertTrue(rdflib.compare.isomorphic(full_graph(doc), doc.graph))
+
     def test_lookup(self):
         # Test simple key lookup via the __getitem__() method
         doc = sbol.Document()
@@ -428,6 +596,216 @@ class TestDocument(unittest.TestCase):
         cd = doc.componentDefinitions[cd.identity]
         self.assertEqual(1, len(cd.components))
 
+    def test_parse_multivalued_extension(self):
+        # Extension properties with several values must keep all of
+        # them after the triples are grouped by subject
+        doc = sbol2.Document()
+        doc.readString(sbol2.document.igem_assembly_scars)
+        cd = doc.componentDefinitions['https://synbiohub.org/public/igem/BBa_G0000/1']
+        owned_by = 'http://wiki.synbiohub.org/wiki/Terms/synbiohub#ownedBy'
+        self.assertEqual(sorted(cd.getPropertyValues(owned_by)),
+                         ['https://synbiohub.org/user/james',
+                          'https://synbiohub.org/user/myers'])
+        self.assertEqual(2, len(cd.roles))
+        self.assertEqual('tactag', cd.sequence.elements)
+
+    def test_streaming_read(self):
+        # The streaming reader and the rdflib reader must produce
+        # identical documents
+        doc = sbol2.Document(CRISPR_LOCATION)
+        unsupported = sbol2.SBOL2Parse.UnsupportedRDFXML('test')
+        with unittest.mock.patch('sbol2.SBOL2Parse.parse_sbol2',
+                                 side_effect=unsupported) as parse:
+            doc2 = sbol2.Document(CRISPR_LOCATION)
+        parse.assert_called_once()
+        self.assertTrue(doc.compare(doc2))
+        self.assertEqual(len(doc), len(doc2))
+
+    def test_streaming_read_fallback(self):
+        # Property attributes are valid RDF/XML that the streaming
+        # reader does not handle. They must be read by rdflib instead.
+        sbol_str = '''<?xml version="1.0" encoding="utf-8"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:sbol="http://sbols.org/v2#">
+  <sbol:Sequence rdf:about="http://examples.org/Sequence/seq/1"
+                 sbol:displayId="seq" sbol:elements="gattaca">
+    <sbol:encoding rdf:resource="http://www.chem.qmul.ac.uk/iubmb/misc/naseq.html"/>
+  </sbol:Sequence>
+</rdf:RDF>
+'''
+        with self.assertRaises(sbol2.SBOL2Parse.UnsupportedRDFXML):
+            sbol2.SBOL2Parse.parse_sbol2_string(sbol_str)
+        doc = sbol2.Document()
+        doc.readString(sbol_str)
+        seq = doc.sequences['http://examples.org/Sequence/seq/1']
+        self.assertEqual('gattaca', seq.elements)
+        self.assertEqual('seq', seq.displayId)
+
+    def test_definitions_using_sequence(self):
+        doc = sbol2.Document()
+        cd1 = doc.componentDefinitions.create('cd1')
+        cd2 = doc.componentDefinitions.create('cd2')
+        seq1 = doc.sequences.create('seq1')
+        seq2 = doc.sequences.create('seq2')
+        cd1.sequences = [seq1.identity]
+        self.assertEqual([cd1], doc.definitions_using_sequence(seq1.identity))
+        self.assertEqual([], doc.definitions_using_sequence(seq2.identity))
+        # The index follows changes to the Document
+        cd2.sequences = [seq1.identity]
+        cd1.sequences = [seq2.identity]
+        self.assertEqual([cd2], doc.definitions_using_sequence(seq1.identity))
+        self.assertEqual([cd1], doc.definitions_using_sequence(seq2.identity))
+        doc.componentDefinitions.remove(cd2.identity)
+        self.assertEqual([], doc.definitions_using_sequence(seq1.identity))
+        cd3 = sbol2.ComponentDefinition('cd3')
+        cd3.sequences = [seq2.identity]
+        doc.add(cd3)
+        self.assertEqual([cd1, cd3], doc.definitions_using_sequence(seq2.identity))
+        doc2 = sbol2.Document()
+        doc2.read(os.path.join(MODULE_LOCATION, 'resources', 'tutorial', 'parts.xml'),
+                  lazy=True)
+        uri = 'http://examples.org/Sequence/AmeR_sequence/1'
+        cds = doc2.definitions_using_sequence(uri)
+        self.assertEqual(['http://examples.org/ComponentDefinition/AmeR/1'],
+                         [cd.identity for cd in cds])
+
+    def test_compile_all(self):
+        doc = sbol2.Document()
+        cd1 = sbol2.ComponentDefinition('cd1')
+        cd2 = sbol2.ComponentDefinition('cd2')
+        cd3 = sbol2.ComponentDefinition('cd3')
+        cd4 = sbol2.ComponentDefinition('cd4')
+        cd5 = sbol2.ComponentDefinition('cd5')
+        cd1.sequence = sbol2.Sequence('cd1_seq', 'tt')
+        cd2.sequence = sbol2.Sequence('cd2_seq', 'ggg')
+        cd3.sequence = sbol2.Sequence('cd3_seq')
+        cd4.sequence = sbol2.Sequence('cd4_seq')
+        cd5.sequence = sbol2.Sequence('cd5_seq')
+        doc.addComponentDefinition([cd1, cd2, cd3, cd4, cd5])
+        cd3.assemblePrimaryStructure([cd1, cd2])
+        cd4.assemblePrimaryStructure([cd3, cd1])
+        cd5.assemblePrimaryStructure([cd2, cd3])
+        # cd3 is a subcomponent of both roots
+        compiled = doc.compile_all()
+        self.assertEqual({cd4.identity: 'ttgggtt', cd5.identity: 'gggttggg'},
+                         compiled)
+        self.assertEqual('ttggg', cd3.sequence.elements)
+        self.assertEqual('ttgggtt', cd4.sequence.elements)
+
+    def test_read_lazy(self):
+        doc = sbol2.Document(CRISPR_LOCATION)
+        doc2 = sbol2.Document()
+        doc2.read(CRISPR_LOCATION, lazy=True)
+        self.assertEqual(0, len(doc2.SBOLObjects))
+        self.assertEqual(doc.resource_namespaces, doc2.resource_namespaces)
+        # Only the top levels that are used are built
+        uri = 'http://sbols.org/CRISPR_Example/CRP_b/1.0.0'
+        cd = doc2.componentDefinitions[uri]
+        self.assertTrue(cd.compare(doc.componentDefinitions[uri]))
+        self.assertEqual(1, len(doc2.SBOLObjects))
+        uri = 'http://sbols.org/CRISPR_Example/CRISPR_Template/target/1.0.0'
+        fc = doc2.find(uri)
+        self.assertEqual(uri, fc.identity)
+        self.assertEqual(2, len(doc2.SBOLObjects))
+        self.assertIs(doc2.moduleDefinitions[0], fc.parent)
+        # Other lookups only build the top levels they could match
+        built = len(doc2.SBOLObjects)
+        self.assertIs(cd, doc2.componentDefinitions['CRP_b'])
+        self.assertEqual(built, len(doc2.SBOLObjects))
+        cd = doc2.componentDefinitions['EYFP']
+        self.assertEqual(doc.componentDefinitions['EYFP'].identity, cd.identity)
+        self.assertEqual(built + 1, len(doc2.SBOLObjects))
+        uri = 'http://sbols.org/CRISPR_Example/mKate'
+        self.assertEqual(doc.componentDefinitions[uri].identity,
+                         doc2.componentDefinitions[uri].identity)
+        self.assertEqual(built + 2, len(doc2.SBOLObjects))
+        self.assertNotIn('nope', doc2.componentDefinitions)
+        self.assertIsNone(doc2.find('http://sbols.org/CRISPR_Example/nope'))
+        self.assertEqual(built + 2, len(doc2.SBOLObjects))
+        # Using a property builds all its top levels
+        self.assertEqual(len(doc.componentDefinitions),
+                         len(doc2.componentDefinitions))
+        self.assertEqual(len(doc.componentDefinitions) + len(doc.moduleDefinitions),
+                         len(doc2.SBOLObjects))
+        seq = sbol2.Sequence('CRa_U6_seq')
+        seq.identity = 'http://sbols.org/CRISPR_Example/CRa_U6_seq/1.0.0'
+        with self.assertRaises(sbol2.SBOLError):
+            doc2.add(seq)
+        # Using the Document as a whole builds everything
+        self.assertEqual(len(doc), len(doc2))
+        self.assertTrue(doc.compare(doc2))
+        doc3 = sbol2.Document()
+        doc3.readString(doc.writeString(), lazy=True)
+        self.assertEqual(doc.writeString(), doc3.writeString())
+
+    def test_read_lazy_find_property_value(self):
+        # Searches of the whole Document build all the top levels
+        uri = 'http://sbols.org/CRISPR_Example/cas9_gRNA_complex'
+        doc = sbol2.Document(CRISPR_LOCATION)
+        expected = doc.find_property_value(sbol2.SBOL_DEFINITION, uri)
+        self.assertEqual(1, len(expected))
+        doc2 = sbol2.Document()
+        doc2.read(CRISPR_LOCATION, lazy=True)
+        found = doc2.find_property_value(sbol2.SBOL_DEFINITION, uri)
+        self.assertEqual([obj.identity for obj in expected],
+                         [obj.identity for obj in found])
+        self.assertEqual(len(doc), len(doc2.SBOLObjects))
+        # Including top levels read after the reference index was built
+        doc3 = sbol2.Document()
+        self.assertEqual([], doc3.find_reference(uri))
+        doc3.read(CRISPR_LOCATION, lazy=True)
+        self.assertEqual(sorted(obj.identity for obj in doc.find_reference(uri)),
+                         sorted(obj.identity for obj in doc3.find_reference(uri)))
+
+    def test_read_lazy_fallback(self):
+        # A top level the streaming reader cannot parse is parsed by
+        # rdflib when it is built
+        sbol_str = '''<?xml version="1.0" encoding="utf-8"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:dcterms="http://purl.org/dc/terms/"
+         xmlns:sbol="http://sbols.org/v2#">
+  <sbol:Sequence rdf:about="http://examples.org/Sequence/seq/1">
+    <sbol:displayId>seq</sbol:displayId>
+    <dcterms:title xml:lang="en">A sequence</dcterms:title>
+    <sbol:elements>gattaca</sbol:elements>
+    <sbol:encoding rdf:resource="http://www.chem.qmul.ac.uk/iubmb/misc/naseq.html"/>
+  </sbol:Sequence>
+</rdf:RDF>
+'''
+        doc = sbol2.Document()
+        doc.readString(sbol_str, lazy=True)
+        self.assertEqual(0, len(doc.SBOLObjects))
+        seq = doc.sequences['http://examples.org/Sequence/seq/1']
+        self.assertEqual('gattaca', seq.elements)
+        self.assertEqual('A sequence', seq.name)
+
+    def test_file_formats(self):
+        # Documents round trip through each configured file format
+        doc = sbol2.Document(CRISPR_LOCATION)
+        file_format = sbol2.Config.getFileFormat()
+        validate = sbol2.Config.getOption(sbol2.ConfigOptions.VALIDATE)
+        sbol2.Config.setOption(sbol2.ConfigOptions.VALIDATE, False)
+        try:
+            for fmt in ['ntriples', 'turtle']:
+                sbol2.Config.setFileFormat(fmt)
+                doc2 = sbol2.Document()
+                doc2.readString(doc.writeString())
+                self.assertEqual(len(doc), len(doc2))
+                self.assertTrue(doc.componentDefinitions[0].compare(
+                    doc2.componentDefinitions[doc.componentDefinitions[0].identity]))
+                with tempfile.TemporaryDirectory() as tmpdirname:
+                    test_path = os.path.join(tmpdirname, 'test.' + fmt)
+                    doc.write(test_path)
+                    doc3 = sbol2.Document(test_path)
+                self.assertEqual(len(doc), len(doc3))
+            sbol2.Config.setFileFormat(sbol2.config.FileFormats.NTRIPLES)
+            sbol_str = doc.writeString()
+            self.assertTrue(sbol_str.startswith('<'))
+            self.assertNotIn('rdf:RDF', sbol_str)
+        finally:
+            sbol2.Config.setFileFormat(file_format)
+            sbol2.Config.setOption(sbol2.ConfigOptions.VALIDATE, validate)
+
 
 class NonTopLevelExtension(sbol2.Identified):
 
@@ -141,6 +141,33 @@ class TestIdentified(unittest.TestCase):
         expected = []
         self.assertEqual(cd.wasGeneratedBy, expected)
 
+    def test_update_uri_not_unique(self):
+        compliant = sbol.Config.getOption(sbol2.ConfigOptions.SBOL_COMPLIANT_URIS)
+        typed = sbol.Config.getOption(sbol2.ConfigOptions.SBOL_TYPED_URIS)
+        homespace = sbol.getHomespace()
+        sbol.setHomespace('http://examples.org')
+        sbol.Config.setOption(sbol2.ConfigOptions.SBOL_COMPLIANT_URIS, False)
+        sbol.Config.setOption(sbol2.ConfigOptions.SBOL_TYPED_URIS, False)
+        try:
+            doc = sbol.Document()
+            cd1 = doc.componentDefinitions.create('cd1')
+            cd2 = doc.componentDefinitions.create('cd2')
+            sa = cd1.sequenceAnnotations.create('sa')
+            # An object elsewhere in the Document already has this URI
+            with self.assertRaises(sbol.SBOLError) as cm:
+                cd2.sequenceAnnotations.add(sbol.SequenceAnnotation('sa'))
+            self.assertEqual(cm.exception.error_code(),
+                             sbol.SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE)
+            # Once the object is removed, its URI is free again
+            cd1.sequenceAnnotations.remove(sa.identity)
+            cd2.sequenceAnnotations.add(sbol.SequenceAnnotation('sa'))
+            self.assertEqual(1, len(cd2.sequenceAnnotations))
+        finally:
+            sbol.Config.setOption(sbol2.ConfigOptions.SBOL_COMPLIANT_URIS,
+                                  compliant)
+            sbol.Config.setOption(sbol2.ConfigOptions.SBOL_TYPED_URIS, typed)
+            sbol.setHomespace(homespace)
+
 
 class TestCopy(unittest.TestCase):
 
@@ -169,6 +196,36 @@ class TestCopy(unittest.TestCase):
         self.assertEqual([sa.identity for sa in cd.sequenceAnnotations],
                          [sa.identity for sa in cd_copy.sequenceAnnotations])
 
+    def test_copy_find_children(self):
+        compliant = sbol.Config.getOption(sbol2.ConfigOptions.SBOL_COMPLIANT_URIS)
+        typed = sbol.Config.getOption(sbol2.ConfigOptions.SBOL_TYPED_URIS)
+        homespace = sbol.getHomespace()
+        sbol.setHomespace('http://examples.org')
+        sbol.Config.setOption(sbol2.ConfigOptions.SBOL_COMPLIANT_URIS, True)
+        sbol.Config.setOption(sbol2.ConfigOptions.SBOL_TYPED_URIS, True)
+        try:
+            doc = sbol.Document()
+            cd = doc.componentDefinitions.create('cd')
+            sa = cd.sequenceAnnotations.create('sa')
+            sa.locations.createRange('r')
+            cd.sequenceAnnotations.create('sa2')
+            # The children of a copy can be found in the target Document
+            doc2 = sbol.Document()
+            cd_copy = cd.copy(doc2)
+            cd_copy2 = cd.copy(doc, version='2')
+            for target_doc, copy in ((doc2, cd_copy), (doc, cd_copy2)):
+                for sa_copy in copy.sequenceAnnotations:
+                    self.assertIs(sa_copy, target_doc.find(sa_copy.identity))
+                    for location in sa_copy.locations:
+                        self.assertIs(location,
+                                      target_doc.find(location.identity))
+            self.assertIs(sa, doc.find(sa.identity))
+        finally:
+            sbol.Config.setOption(sbol2.ConfigOptions.SBOL_COMPLIANT_URIS,
+                                  compliant)
+            sbol.Config.setOption(sbol2.ConfigOptions.SBOL_TYPED_URIS, typed)
+            sbol.setHomespace(homespace)
+
     def test_import_object_into_new_namespace(self):
         # When copying an object into a new namespace, confirm that it's URI is copied
         # into the new namespace. Also confirm that any ReferencedObject attributes
@@ -258,6 +258,45 @@ class TestObject(unittest.TestCase):
         c = sbol.Cut()
         self.assertEqual('0', c.getPropertyValue(sbol.SBOL_AT))
 
+    def test_compact_storage(self):
+        cd = sbol2.ComponentDefinition('cd')
+        # The attributes every object has are in slots, the instance
+        # dictionary only holds properties
+        for name in ('owned_objects', 'properties', 'doc', 'parent', 'rdf_type'):
+            self.assertNotIn(name, cd.__dict__)
+        self.assertEqual(sbol2.SBOL_COMPONENT_DEFINITION, cd.rdf_type)
+        self.assertIsInstance(cd.properties, dict)
+        # URIRef keys and str keys are interchangeable
+        cd.properties[rdflib.URIRef('http://example.org/p')] = ['x']
+        self.assertEqual(['x'], cd.properties['http://example.org/p'])
+        self.assertEqual(['x'], cd.properties.get(rdflib.URIRef('http://example.org/p')))
+        # Unused stores are shared
+        self.assertIs(cd._hidden_properties,
+                      sbol2.Range('r')._hidden_properties)
+
+    def test_transparent_properties(self):
+        # Properties are stored on the instance and made transparent
+        # by a descriptor on the class
+        cd = sbol2.ComponentDefinition('cd')
+        self.assertIsInstance(cd.__dict__['roles'], sbol2.URIProperty)
+        self.assertEqual([], cd.roles)
+        cd.roles = [sbol2.SO_PROMOTER]
+        self.assertEqual([sbol2.SO_PROMOTER], cd.roles)
+        self.assertIsInstance(cd.__dict__['roles'], sbol2.URIProperty)
+        # Plain attributes are untouched
+        cd.plain_attribute = 'bar'
+        self.assertEqual('bar', cd.plain_attribute)
+        self.assertNotIn('plain_attribute', type(cd).__dict__)
+        # Properties added by an extension class are transparent too
+        ext = sbol2.TopLevel('http://example.org/Ext', 'ext')
+        ext.count = sbol2.IntProperty(ext, 'http://example.org/count',
+                                      '0', '1', None, 3)
+        self.assertEqual(3, ext.count)
+        ext.count = 4
+        self.assertEqual(4, ext.count)
+        self.assertEqual([rdflib.Literal(4)],
+                         ext.properties['http://example.org/count'])
+
 
 if __name__ == '__main__':
     unittest.main()
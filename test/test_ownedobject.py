@@ -180,6 +180,110 @@ class TestOwnedObject(unittest.TestCase):
         self.assertEqual(raised.error_code(),
                          sbol2.SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE)
 
+    def test_lookup_index(self):
+        doc = sbol2.Document()
+        cd1 = doc.componentDefinitions.create('cd1')
+        # Copy into the same document as a new version
+        cd1_2 = cd1.copy(version='2')
+        self.assertIs(cd1, doc.componentDefinitions[cd1.identity])
+        self.assertIs(cd1_2, doc.componentDefinitions[cd1_2.identity])
+        # The newest version is found by persistentIdentity or displayId
+        self.assertIs(cd1_2, doc.componentDefinitions[cd1.persistentIdentity])
+        self.assertIs(cd1_2, doc.componentDefinitions['cd1'])
+        # The index follows changes to the store
+        doc.componentDefinitions.remove(cd1_2.identity)
+        self.assertIs(cd1, doc.componentDefinitions['cd1'])
+        self.assertNotIn(cd1_2.identity, doc.componentDefinitions)
+        cd1.sequenceAnnotations = [sbol2.SequenceAnnotation('sa1')]
+        self.assertIn('sa1', cd1.sequenceAnnotations)
+        cd1.sequenceAnnotations = [sbol2.SequenceAnnotation('sa2')]
+        self.assertNotIn('sa1', cd1.sequenceAnnotations)
+        self.assertIn('sa2', cd1.sequenceAnnotations)
+        # And to the identities of the objects in it
+        sa2 = cd1.sequenceAnnotations['sa2']
+        old_identity = sa2.identity
+        sa2.identity = old_identity + '_new'
+        self.assertNotIn(old_identity, cd1.sequenceAnnotations)
+        self.assertIs(sa2, cd1.sequenceAnnotations[old_identity + '_new'])
+
+    def test_extend(self):
+        doc = sbol2.Document()
+        cd = doc.componentDefinitions.create('cd')
+        annotations = [sbol2.SequenceAnnotation('sa{}'.format(i))
+                       for i in range(3)]
+        cd.sequenceAnnotations.extend(annotations)
+        self.assertEqual(annotations, list(cd.sequenceAnnotations))
+        for sa in annotations:
+            self.assertIs(cd, sa.parent)
+            self.assertIs(sa, doc.find(sa.identity))
+        with self.assertRaises(sbol2.SBOLError) as cm:
+            cd.sequenceAnnotations.extend([sbol2.SequenceAnnotation('sa1')])
+        self.assertEqual(cm.exception.error_code(),
+                         sbol2.SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE)
+        # Top levels are added to the Document
+        md = doc.moduleDefinitions.create('md')
+        doc.moduleDefinitions.extend([sbol2.ModuleDefinition('md2')])
+        self.assertEqual(2, len(doc.moduleDefinitions))
+        self.assertIn(md.identity, doc.moduleDefinitions)
+
+    def test_extend_not_unique(self):
+        doc = sbol2.Document()
+        cd = doc.componentDefinitions.create('cd')
+        cd.sequenceAnnotations.create('sa1')
+        # A duplicate in the middle of the batch adds none of the objects
+        annotations = [sbol2.SequenceAnnotation('sa{}'.format(i))
+                       for i in (2, 1, 3)]
+        with self.assertRaises(sbol2.SBOLError) as cm:
+            cd.sequenceAnnotations.extend(annotations)
+        self.assertEqual(cm.exception.error_code(),
+                         sbol2.SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE)
+        # So do two objects with the same URI
+        annotations[1] = sbol2.SequenceAnnotation('sa2')
+        with self.assertRaises(sbol2.SBOLError) as cm:
+            cd.sequenceAnnotations.extend(annotations)
+        self.assertEqual(cm.exception.error_code(),
+                         sbol2.SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE)
+        self.assertEqual(1, len(cd.sequenceAnnotations))
+        for sa in annotations:
+            self.assertIsNone(sa.parent)
+            self.assertIsNone(sa.doc)
+        # Top levels too
+        mds = [sbol2.ModuleDefinition('md{}'.format(i)) for i in (1, 2, 1)]
+        with self.assertRaises(sbol2.SBOLError) as cm:
+            doc.moduleDefinitions.extend(mds)
+        self.assertEqual(cm.exception.error_code(),
+                         sbol2.SBOLErrorCode.SBOL_ERROR_URI_NOT_UNIQUE)
+        self.assertEqual(0, len(doc.moduleDefinitions))
+
+    def test_next_free_id(self):
+        cd = sbol2.ComponentDefinition('cd')
+        self.assertEqual('sa_0', cd.sequenceAnnotations.next_free_id('sa'))
+        cd.sequenceAnnotations.create('sa_0')
+        cd.sequenceAnnotations.create('sa_1')
+        self.assertEqual('sa_2', cd.sequenceAnnotations.next_free_id('sa'))
+        # IDs are unique among all the objects of the owner
+        cd.components.create('sa_2')
+        self.assertEqual('sa_3', cd.sequenceAnnotations.next_free_id('sa'))
+        self.assertEqual('c_0', cd.components.next_free_id('c'))
+        # Removing an object frees its ID
+        cd.sequenceAnnotations.remove(cd.sequenceAnnotations['sa_0'].identity)
+        self.assertEqual('sa_0', cd.sequenceAnnotations.next_free_id('sa'))
+
+    def test_store_replaced_directly(self):
+        cd = sbol2.ComponentDefinition('cd')
+        cd.sequenceAnnotations.create('sa_0')
+        cd.sequenceAnnotations.create('sa_1')
+        self.assertEqual('sa_2', cd.sequenceAnnotations.next_free_id('sa'))
+        # Replacing the store bypasses the OwnedObject but not its index
+        sa = sbol2.SequenceAnnotation('sa_2')
+        sa.parent = cd
+        sa.update_uri()
+        store = cd.owned_objects[sbol2.SBOL_SEQUENCE_ANNOTATIONS]
+        cd.owned_objects[sbol2.SBOL_SEQUENCE_ANNOTATIONS] = [store[0], sa]
+        self.assertIs(sa, cd.sequenceAnnotations['sa_2'])
+        self.assertNotIn('sa_1', cd.sequenceAnnotations)
+        self.assertEqual('sa_1', cd.sequenceAnnotations.next_free_id('sa'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,9 @@
 import datetime
+import gc
 import math
 import unittest
 import os
+import weakref
 
 import sbol2
 
@@ -342,6 +344,39 @@ class TestProperty(unittest.TestCase):
                                                       sbol.Identified,
                                                       math.inf, 1, None)
 
+    def test_shared_schema(self):
+        # Objects of the same class share the definition of each
+        # property. Only the owner is stored per instance.
+        cd1 = sbol2.ComponentDefinition('cd1')
+        cd2 = sbol2.ComponentDefinition('cd2')
+        roles1 = cd1.__dict__['roles']
+        roles2 = cd2.__dict__['roles']
+        self.assertIsNot(roles1, roles2)
+        self.assertIs(roles1._schema, roles2._schema)
+        self.assertEqual(sbol2.SBOL_ROLES, roles1.getTypeURI())
+        self.assertEqual('*', roles1.getUpperBound())
+        self.assertFalse(hasattr(roles1, '__dict__'))
+        cd1.roles = [sbol2.SO_PROMOTER]
+        self.assertEqual([], cd2.roles)
+
+    def test_schema_bound_method_rule(self):
+        # Schemas with bound method rules are not cached, so the cache
+        # does not keep the objects alive
+        class Ext(sbol2.ComponentDefinition):
+            def __init__(self, uri='ext'):
+                super().__init__(uri)
+                self.note = sbol2.TextProperty(self, 'http://examples.org#note',
+                                               '0', '1', [self.check])
+
+            def check(self, sbol_obj, arg):
+                pass
+
+        ext = Ext()
+        ref = weakref.ref(ext)
+        del ext
+        gc.collect()
+        self.assertIsNone(ref())
+
 
 class TestIntProperty(unittest.TestCase):
 
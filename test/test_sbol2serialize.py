@@ -0,0 +1,90 @@
+import os
+import unittest
+
+from lxml.etree import QName
+import rdflib
+
+import sbol2
+import sbol2.SBOL2Serialize as SBOL2Serialize
+
+MODULE_LOCATION = os.path.dirname(os.path.abspath(__file__))
+CRISPR_LOCATION = os.path.join(MODULE_LOCATION, 'resources', 'crispr_example.xml')
+
+
+class TestOwnershipSchema(unittest.TestCase):
+
+    def test_ownership_schema(self):
+        schema = SBOL2Serialize.ownership_schema(sbol2.ComponentDefinition)
+        self.assertIn(rdflib.URIRef(sbol2.SBOL_SEQUENCE_ANNOTATIONS), schema)
+        self.assertNotIn(rdflib.URIRef(sbol2.SBOL_SEQUENCE_PROPERTY), schema)
+        self.assertIs(schema,
+                      SBOL2Serialize.ownership_schema(sbol2.ComponentDefinition))
+
+    def test_ownership_predicates(self):
+        # Kept for compatibility as a view of the ownership schemas
+        predicates = SBOL2Serialize.OWNERSHIP_PREDICATES
+        self.assertIn(rdflib.URIRef(sbol2.SBOL_COMPONENT_DEFINITION),
+                      predicates[sbol2.SBOL_SEQUENCE_ANNOTATIONS])
+        self.assertNotIn(rdflib.URIRef(sbol2.SBOL_SEQUENCE_PROPERTY), predicates)
+        with self.assertWarns(DeprecationWarning):
+            SBOL2Serialize.register_ownership_relation(sbol2.SBOL_COMPONENT_DEFINITION,
+                                                       sbol2.SBOL_SEQUENCE_PROPERTY)
+        self.assertNotIn(rdflib.URIRef(sbol2.SBOL_SEQUENCE_PROPERTY), predicates)
+
+    def test_serialize_graph(self):
+        # Ownership comes from the schema, not from objects serialized
+        # earlier, so a graph read straight from a file is nested
+        graph = rdflib.Graph()
+        graph.parse(CRISPR_LOCATION, format='xml')
+        result = SBOL2Serialize.serialize_sboll2(graph).decode('utf-8')
+        self.assertIn('<sbol:functionalComponent>', result)
+        # No FunctionalComponent at the top level
+        self.assertNotIn('\n  <sbol:FunctionalComponent ', result)
+
+
+class TestQNameCache(unittest.TestCase):
+
+    def test_longest_match(self):
+        prefixes = {'ex': 'http://example.org/',
+                    'exterms': 'http://example.org/terms#'}
+        qnames = SBOL2Serialize.QNameCache(prefixes)
+        self.assertEqual(QName('http://example.org/terms#', 'foo'),
+                         qnames.qname('http://example.org/terms#foo'))
+        self.assertEqual(QName('http://example.org/', 'bar'),
+                         qnames.qname('http://example.org/bar'))
+
+    def test_cache(self):
+        qnames = SBOL2Serialize.QNameCache({'ex': 'http://example.org/'})
+        qname = qnames.qname('http://example.org/foo')
+        self.assertIs(qname, qnames.qname('http://example.org/foo'))
+
+    def test_new_prefix(self):
+        prefixes = {'ex': 'http://example.org/'}
+        qnames = SBOL2Serialize.QNameCache(prefixes)
+        qname = qnames.qname('http://other.org/terms#foo')
+        self.assertEqual(QName('http://other.org/terms#', 'foo'), qname)
+        self.assertEqual('http://other.org/terms#', prefixes['ns0'])
+        # The new prefix is used for other IRIs in the namespace
+        self.assertEqual(QName('http://other.org/terms#', 'bar'),
+                         qnames.qname('http://other.org/terms#bar'))
+        self.assertEqual(2, len(prefixes))
+
+    def test_prefixify(self):
+        prefixes = {'ex': 'http://example.org/'}
+        self.assertEqual('http://other.org/foo',
+                         SBOL2Serialize.prefixify('http://other.org/foo',
+                                                  prefixes, False))
+        self.assertEqual(1, len(prefixes))
+        # The longest matching namespace is used
+        prefixes['terms'] = 'http://example.org/terms#'
+        self.assertEqual(QName('http://example.org/terms#', 'foo'),
+                         SBOL2Serialize.prefixify('http://example.org/terms#foo',
+                                                  prefixes, False))
+        self.assertEqual(QName('http://other.org/', 'foo'),
+                         SBOL2Serialize.prefixify('http://other.org/foo',
+                                                  prefixes, True))
+        self.assertEqual('http://other.org/', prefixes['ns0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
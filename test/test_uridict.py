@@ -0,0 +1,89 @@
+import os
+import unittest
+import unittest.mock
+
+import rdflib
+
+import sbol2
+import sbol2.uridict
+from sbol2.uridict import URIDict, intern_uri, uri_key
+
+MODULE_LOCATION = os.path.dirname(os.path.abspath(__file__))
+CRISPR_LOCATION = os.path.join(MODULE_LOCATION, 'resources', 'crispr_example.xml')
+
+
+class TestURIDict(unittest.TestCase):
+
+    def test_uriref_keys(self):
+        d = URIDict()
+        uri = 'http://example.org/foo'
+        d[rdflib.URIRef(uri)] = 1
+        self.assertIs(str, type(list(d.keys())[0]))
+        self.assertEqual(1, d[uri])
+        self.assertEqual(1, d[rdflib.URIRef(uri)])
+        self.assertIn(rdflib.URIRef(uri), d)
+        self.assertEqual(1, d.get(rdflib.URIRef(uri)))
+        self.assertEqual(1, d.pop(rdflib.URIRef(uri)))
+        self.assertNotIn(uri, d)
+
+    def test_mapping_api(self):
+        uri = 'http://example.org/foo'
+        d = URIDict({rdflib.URIRef(uri): 1})
+        self.assertEqual([uri], list(d))
+        self.assertIs(str, type(list(d)[0]))
+        self.assertEqual(1, d[rdflib.URIRef(uri)])
+        self.assertEqual(2, URIDict(d, bar=2)['bar'])
+        self.assertIn(rdflib.URIRef(uri), d.keys())
+        self.assertEqual([uri], list(d.keys()))
+        d2 = d.copy()
+        self.assertIsInstance(d2, URIDict)
+        d2[rdflib.URIRef('http://example.org/bar')] = 2
+        self.assertEqual(2, d2['http://example.org/bar'])
+        self.assertEqual(1, len(d))
+
+    def test_missing(self):
+        d = URIDict()
+        with self.assertRaises(KeyError):
+            d['http://example.org/foo']
+        with self.assertRaises(KeyError):
+            d[rdflib.URIRef('http://example.org/foo')]
+        self.assertIsNone(d.get(rdflib.URIRef('http://example.org/foo')))
+
+    def test_uri_key(self):
+        uri = 'http://example.org/' + 'foo'
+        key = uri_key(rdflib.URIRef(uri))
+        self.assertIs(str, type(key))
+        self.assertIs(key, uri_key(uri))
+
+
+class TestInternURI(unittest.TestCase):
+
+    def test_intern_uri(self):
+        uri = intern_uri('http://example.org/' + 'foo')
+        self.assertIsInstance(uri, rdflib.URIRef)
+        self.assertIs(uri, intern_uri('http://example.org/foo'))
+        self.assertIs(uri, intern_uri(rdflib.URIRef('http://example.org/foo')))
+
+    def test_pool_size(self):
+        with unittest.mock.patch.object(sbol2.uridict, 'URI_POOL_SIZE', 2):
+            for i in range(5):
+                intern_uri('http://example.org/{}'.format(i))
+                self.assertLessEqual(len(sbol2.uridict._uri_pool), 2)
+
+    def test_shared_values(self):
+        # Equal values read from a file are the same object
+        doc = sbol2.Document(CRISPR_LOCATION)
+        types = [cd.properties[sbol2.SBOL_TYPES][0]
+                 for cd in doc.componentDefinitions
+                 if cd.types == [sbol2.BIOPAX_DNA]]
+        self.assertGreater(len(types), 1)
+        for uri in types:
+            self.assertIs(types[0], uri)
+        # And values set through properties
+        cd = sbol2.ComponentDefinition('cd')
+        cd.types = [sbol2.BIOPAX_DNA]
+        self.assertIs(types[0], cd.properties[sbol2.SBOL_TYPES][0])
+
+
+if __name__ == '__main__':
+    unittest.main()